@@ -1,31 +1,38 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import models
 import schemas
-from database import engine, get_db
-from sentiment_model import SentimentAnalyzer
+import crud
+from database import engine, get_async_db, check_connection, dispose_async_engine, get_pool_stats, PoolTimeoutError
+from inference_pool import InferenceQueueFull
+from runtime import ServiceRuntime
+from auth_cache import UserCache, principal_from_claims, token_claims, AUTH_TRUST_JWT_CLAIMS
+from password_hashing import PasswordHasher, PasswordHasherBusy, LoginRateLimiter, TooManyAttempts
+import bulk
+import history
+import rollups
+import export
+import logging_config
+import metrics
+import profiling
+import model_metadata
 import os
-import glob
-import re
-import json
 from dotenv import load_dotenv
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; see LOG_FORMAT, LOG_SAMPLE_RATE and LOG_QUEUE
+logging_config.configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="Sentiment Analysis API")
 
 # Configure CORS
@@ -51,32 +58,113 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request counts and durations for /metrics, plus a Server-Timing header per response
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Outermost, so everything logged while handling a request carries its id
+app.add_middleware(logging_config.RequestIdMiddleware)
+
 # Security
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is deliberately slow, so it runs on its own bounded pool instead of
+# the event loop, and accounts are locked out after repeated failed logins
+password_hasher = PasswordHasher(pwd_context)
+login_limiter = LoginRateLimiter()
+# Authenticated users are reused for a short TTL instead of queried per request
+user_cache = UserCache()
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Initialize sentiment analyzer
-sentiment_analyzer = SentimentAnalyzer.get_instance()
+def init_database():
+    check_connection()
+    # Create database tables
+    models.Base.metadata.create_all(bind=engine)
 
-# Authentication functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# The runtime connects the database and loads the sentiment model, either
+# before the server binds or in the background (STARTUP_MODE=lazy). It runs
+# inference on a bounded thread pool so the event loop stays responsive,
+# coalescing concurrent analyze requests into batched forward passes and
+# answering repeated texts from the prediction cache
+runtime = ServiceRuntime(init_database)
+require_model = Depends(runtime.require_ready)
+
+def collect_runtime_metrics():
+    """The /*-stats numbers as gauges, read when /metrics is scraped"""
+    lines = metrics.stats_gauges("inference", runtime.batcher.stats() if runtime.batcher else None, "See /inference-stats")
+    lines += metrics.stats_gauges("persistence", runtime.writer.stats(), "See /persistence-stats")
+    lines += metrics.stats_gauges("db_pool", get_pool_stats(), "See /db-stats")
+    lines += metrics.stats_gauges("password_hashing", password_hasher.stats(), "See /auth-stats")
+    lines += metrics.stats_gauges("user_cache", user_cache.stats(), "See /auth-stats")
+    return lines
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+metrics.register_collector(collect_runtime_metrics)
 
-def get_user(db, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+@app.on_event("startup")
+async def start_runtime():
+    await runtime.start()
 
-def authenticate_user(db, email: str, password: str):
-    user = get_user(db, email)
+@app.on_event("shutdown")
+async def stop_runtime():
+    await runtime.stop()
+    password_hasher.shutdown()
+    await dispose_async_engine()
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request, exc: InferenceQueueFull):
+    logger.warning("Rejecting request, %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Sentiment model is overloaded, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(profiling.ProfileInProgress)
+async def profile_in_progress_handler(request, exc: profiling.ProfileInProgress):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc: PasswordHasherBusy):
+    logger.warning("Rejecting request, %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many logins in progress, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(PoolTimeoutError)
+async def db_pool_timeout_handler(request, exc: PoolTimeoutError):
+    logger.warning("Rejecting request, database connection pool exhausted: %s", get_pool_stats())
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(TooManyAttempts)
+async def too_many_attempts_handler(request, exc: TooManyAttempts):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many failed login attempts, please retry later"},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
+
+# Authentication functions
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
+
+async def authenticate_user(db, email: str, password: str):
+    user = await crud.get_user(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -90,153 +178,122 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: crud.DbSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with metrics.stage("auth"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+            token_data = schemas.TokenData(email=email)
+        except JWTError:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = get_user(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    return user
+        if AUTH_TRUST_JWT_CLAIMS:
+            # The signature already vouches for the claims
+            principal = principal_from_claims(payload)
+            if principal is not None:
+                return principal
+        principal = user_cache.get(token_data.email)
+        if principal is None:
+            user = await crud.get_user(db, token_data.email)
+            # Hand the connection back now: analyze requests go on to wait for
+            # the analysis writer, which needs a connection from the same pool
+            await crud.release(db)
+            if user is None:
+                raise credentials_exception
+            principal = schemas.User.model_validate(user)
+            user_cache.put(token_data.email, principal)
+        return principal
 
-def get_latest_model_metrics():
-    """Get the latest model metrics from the evaluation directory"""
-    eval_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "evaluation")
-    
-    if not os.path.exists(eval_dir):
-        logger.warning(f"Evaluation directory not found: {eval_dir}")
-        return None
-    
-    # Find all results files
-    result_files = glob.glob(os.path.join(eval_dir, "results_*.txt"))
-    
-    if not result_files:
-        logger.warning(f"No evaluation result files found in {eval_dir}")
-        return None
-    
-    # Sort by timestamp in filename (newest first)
-    result_files.sort(reverse=True)
-    latest_file = result_files[0]
-    
-    # Parse metrics from file
-    metrics = {}
-    try:
-        with open(latest_file, 'r') as f:
-            content = f.read()
-            
-            # Extract metrics using regex
-            accuracy = re.search(r'accuracy: ([\d\.]+)', content)
-            f1 = re.search(r'f1: ([\d\.]+)', content)
-            precision = re.search(r'precision: ([\d\.]+)', content)
-            recall = re.search(r'recall: ([\d\.]+)', content)
-            
-            if accuracy:
-                metrics['accuracy'] = float(accuracy.group(1))
-            if f1:
-                metrics['f1'] = float(f1.group(1))
-            if precision:
-                metrics['precision'] = float(precision.group(1))
-            if recall:
-                metrics['recall'] = float(recall.group(1))
-                
-            # Extract timestamp from filename
-            timestamp_match = re.search(r'results_(\d{8}_\d{6})\.txt', os.path.basename(latest_file))
-            if timestamp_match:
-                timestamp_str = timestamp_match.group(1)
-                timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                metrics['timestamp'] = timestamp.isoformat()
-    
-    except Exception as e:
-        logger.error(f"Error parsing metrics file: {str(e)}")
-        return None
-    
-    return metrics
+async def get_admin_user(current_user: schemas.User = Depends(get_current_user)):
+    """The current user, if listed in PROFILING_ADMINS"""
+    if not profiling.is_admin(current_user.email):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Limited to admins")
+    return current_user
+
+# Queue depths, pool occupancy and lockout counts say how loaded the service is
+require_admin = Depends(get_admin_user)
 
 # API Endpoints
 @app.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: schemas.UserCreate, db: crud.DbSession = Depends(get_async_db)):
     try:
-        logger.info(f"Registration attempt for email: {user.email}")
-        db_user = get_user(db, email=user.email)
+        logger.debug("Registration attempt for user: %s", logging_config.user_ref(user.email))
+        db_user = await crud.get_user(db, user.email)
         if db_user:
-            logger.warning(f"Email already registered: {user.email}")
+            logger.info("Registration rejected, email already registered")
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        logger.debug(f"Hashing password for user: {user.email}")
+        logger.debug("Hashing password for user: %s", logging_config.user_ref(user.email))
         try:
-            hashed_password = get_password_hash(user.password)
-            logger.debug(f"Password hashed successfully")
+            hashed_password = await get_password_hash(user.password)
+            logger.debug("Password hashed successfully")
+        except PasswordHasherBusy:
+            raise
         except Exception as hash_error:
-            logger.error(f"Password hashing error: {str(hash_error)}", exc_info=True)
+            logger.error("Password hashing error: %s", hash_error, exc_info=True)
             raise HTTPException(status_code=500, detail=f"Password hashing failed: {str(hash_error)}")
         
-        logger.debug(f"Creating user object for: {user.email}")
+        logger.debug("Creating user object for: %s", logging_config.user_ref(user.email))
         try:
-            db_user = models.User(email=user.email, hashed_password=hashed_password)
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-            logger.info(f"User registered successfully: {user.email}")
+            db_user = await crud.add_user(db, user.email, hashed_password)
+            user_cache.invalidate(db_user.email)
+            logger.info("User registered successfully: %s", db_user.id)
             return db_user
         except Exception as db_error:
-            logger.error(f"Database error: {str(db_error)}", exc_info=True)
-            db.rollback()
+            logger.error("Database error: %s", db_error, exc_info=True)
+            await crud.rollback(db)
             raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
-    except HTTPException:
+    except (HTTPException, PasswordHasherBusy):
         raise
     except Exception as e:
-        logger.error(f"Registration error: {str(e)}", exc_info=True)
+        logger.error("Registration error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    logger.info(f"Login attempt for username: {form_data.username}")
-    logger.info(f"Form data: {form_data}")
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: crud.DbSession = Depends(get_async_db)):
+    logger.debug("Login attempt for user: %s", logging_config.user_ref(form_data.username))
     
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        logger.warning(f"Failed login attempt for username: {form_data.username}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # The attempt counts against the account's budget while bcrypt runs
+    with login_limiter.attempt(form_data.username):
+        user = await authenticate_user(db, form_data.username, form_data.password)
+        if not user:
+            login_limiter.record_failure(form_data.username)
+            logger.warning("Failed login attempt for user: %s", logging_config.user_ref(form_data.username))
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    login_limiter.reset(form_data.username)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
-    logger.info(f"User logged in successfully: {form_data.username}")
+    logger.info("User logged in successfully: %s", user.id, extra=logging_config.SAMPLED)
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/analyze", response_model=schemas.SentimentResponse)
+@app.post("/analyze", response_model=schemas.SentimentResponse, dependencies=[require_model])
 async def analyze_sentiment(
     request: schemas.SentimentRequest,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: schemas.User = Depends(get_current_user)
 ):
-    logger.info(f"Sentiment analysis request from user: {current_user.email}")
+    logger.info("Sentiment analysis request from user: %s", current_user.id, extra=logging_config.SAMPLED)
     # Perform sentiment analysis
-    sentiment, confidence = sentiment_analyzer.analyze(request.text)
+    sentiment, confidence = await runtime.batcher.submit(request.text)
     
-    # Create database record
-    db_analysis = models.SentimentAnalysis(
-        text=request.text,
-        sentiment=sentiment,
-        confidence=confidence
-    )
-    db.add(db_analysis)
-    db.commit()
-    db.refresh(db_analysis)
+    # Queue the database record; see PERSIST_MODE for when this returns
+    await runtime.writer.record({
+        "user_id": current_user.id,
+        "text": request.text,
+        "sentiment": sentiment,
+        "confidence": confidence,
+    })
     
     # Return response
     return schemas.SentimentResponse(
@@ -245,77 +302,239 @@ async def analyze_sentiment(
         timestamp=datetime.now()
     )
 
-@app.get("/model-info")
-async def get_model_info(current_user: models.User = Depends(get_current_user)):
-    logger.info(f"Model info request from user: {current_user.email}")
-    return sentiment_analyzer.get_model_info()
+@app.post("/analyze-batch", dependencies=[require_model])
+async def analyze_sentiment_batch(
+    request: Request,
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """Analyze many texts in one call, streaming NDJSON results as they complete
+
+    Accepts {"texts": [...]}, a bare JSON array, or an NDJSON upload
+    (Content-Type: application/x-ndjson). Each result line carries the
+    index of its text in the request.
+    """
+    texts = await bulk.read_batch_texts(request)
+    logger.info("Batch sentiment analysis request for %d texts from user: %s", len(texts), current_user.id, extra=logging_config.SAMPLED)
+    return bulk.batch_response(
+        texts, runtime.analyzer, runtime.pool, runtime.writer, runtime.cache, user_id=current_user.id
+    )
+
+@app.get("/model-info", dependencies=[require_model])
+async def get_model_info(request: Request, current_user: schemas.User = Depends(get_current_user)):
+    logger.debug("Model info request from user: %s", current_user.id)
+    body, etag = runtime.metadata.model_info(runtime.analyzer).get()
+    return history.conditional_json(request, body, model_metadata.CACHE_CONTROL, etag)
 
 @app.get("/model-metrics")
-async def get_metrics(current_user: models.User = Depends(get_current_user)):
-    logger.info(f"Model metrics request from user: {current_user.email}")
-    metrics = get_latest_model_metrics()
-    
-    if not metrics:
-        # Try to get metrics from model_info.json
-        model_path = os.getenv("MODEL_PATH", "../model/fine_tuned_model")
-        model_info_path = os.path.join(model_path, "model_info.json")
-        
-        if os.path.exists(model_info_path):
-            try:
-                with open(model_info_path, 'r') as f:
-                    model_info = json.load(f)
-                    metrics = {
-                        "accuracy": model_info.get("accuracy", 0.9245),
-                        "f1": model_info.get("f1_score", 0.9187),
-                        "precision": model_info.get("precision", 0.9312),
-                        "recall": model_info.get("recall", 0.9065),
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    return metrics
-            except Exception as e:
-                logger.error(f"Error loading model_info.json: {str(e)}")
-        
-        # Return sample metrics if no metrics file is found
-        logger.warning("No metrics file found, returning sample metrics")
-        return {
-            "accuracy": 0.9245,
-            "f1": 0.9187,
-            "precision": 0.9312,
-            "recall": 0.9065,
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    return metrics
+async def get_metrics(request: Request, current_user: schemas.User = Depends(get_current_user)):
+    logger.debug("Model metrics request from user: %s", current_user.id)
+    body, etag = runtime.metadata.metrics.get()
+    return history.conditional_json(request, body, model_metadata.CACHE_CONTROL, etag)
+
+@app.get("/inference-stats", dependencies=[require_admin, require_model])
+async def get_inference_stats():
+    return runtime.batcher.stats()
+
+@app.get("/persistence-stats", dependencies=[require_admin])
+async def get_persistence_stats():
+    return runtime.writer.stats()
+
+@app.get("/db-stats", dependencies=[require_admin])
+async def get_db_stats():
+    return get_pool_stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics_exposition():
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.post("/admin/profile", include_in_schema=False)
+async def capture_profile(
+    seconds: float = Query(10, gt=0, le=profiling.PROFILE_MAX_SECONDS),
+    hz: int = Query(profiling.PROFILE_SAMPLE_HZ, ge=1, le=profiling.PROFILE_MAX_HZ),
+    torch_ops: bool = True,
+    current_user: schemas.User = Depends(get_current_user),
+):
+    """Sampling profile of the worker serving this request, as collapsed stacks for flamegraph tools"""
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if not profiling.is_admin(current_user.email):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling is limited to admins")
+    logger.info("Profile capture requested by user: %s", current_user.id)
+    body = await profiling.capture(seconds, hz, torch_ops)
+    filename = f"profile-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.folded"
+    return PlainTextResponse(
+        body,
+        media_type=profiling.MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/auth-stats", dependencies=[require_admin])
+async def get_auth_stats():
+    return {
+        "password_hashing": password_hasher.stats(),
+        "login_rate_limit": login_limiter.stats(),
+        "user_cache": user_cache.stats(),
+    }
 
 @app.get("/health")
 async def health_check():
-    logger.info("Health check request")
+    logger.debug("Health check request")
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 until then"""
+    startup_status = runtime.status()
+    status_code = status.HTTP_200_OK if runtime.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=startup_status)
+
+@app.get("/history", response_model=schemas.HistoryPage)
+async def read_history(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(history.HISTORY_PAGE_SIZE, ge=1, le=history.HISTORY_MAX_PAGE_SIZE),
+    sentiment: Optional[Literal["positive", "negative", "neutral"]] = None,
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_user),
+    db: crud.DbSession = Depends(get_async_db),
+):
+    """Page through the current user's analyses, newest first
+
+    Follow next_cursor for older pages. Send a page's ETag back in
+    If-None-Match to get an empty 304 when it has not changed.
+    """
+    # One extra row tells whether another page follows
+    rows = await crud.list_analyses(
+        db, current_user.id, limit + 1,
+        after=history.decode_cursor(cursor),
+        sentiment=sentiment,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        since=since,
+        until=until,
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = history.encode_cursor(rows[-1].created_at, rows[-1].id)
+    page = schemas.HistoryPage(
+        items=[schemas.AnalysisRecord.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+    # Pages behind a cursor only hold older rows, which new analyses never change
+    cache_control = "private, max-age=60" if cursor else "private, no-cache"
+    return history.conditional_json(request, page.model_dump_json(), cache_control)
+
+@app.get("/search", response_model=schemas.SearchResponse)
+async def search_analyses(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(history.HISTORY_PAGE_SIZE, ge=1, le=history.HISTORY_MAX_PAGE_SIZE),
+    order: Literal["rank", "recent"] = "rank",
+    sentiment: Optional[Literal["positive", "negative", "neutral"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_user),
+    db: crud.DbSession = Depends(get_async_db),
+):
+    """Full-text search over the current user's analysed texts
+
+    q takes web search syntax: quoted phrases, OR, and -term to exclude.
+    """
+    rows = await crud.search_analyses(
+        db, current_user.id, q, limit,
+        order=order,
+        sentiment=sentiment,
+        since=since,
+        until=until,
+    )
+    return schemas.SearchResponse(
+        query=q,
+        results=[
+            schemas.SearchResult(**schemas.AnalysisRecord.model_validate(analysis).model_dump(), rank=rank)
+            for analysis, rank in rows
+        ],
+    )
+
+@app.get("/trends", response_model=schemas.TrendsResponse)
+async def read_trends(
+    granularity: Literal["hour", "day"] = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_user),
+    db: crud.DbSession = Depends(get_async_db),
+):
+    """Sentiment counts per hour or day for the current user, read from the rollups only"""
+    until = until or datetime.now(timezone.utc)
+    since = since or until - rollups.TRENDS_DEFAULT_WINDOW[granularity]
+    rows = await crud.list_rollups(db, current_user.id, granularity, since, until, rollups.TRENDS_MAX_BUCKETS)
+    return schemas.TrendsResponse(
+        granularity=granularity,
+        buckets=[rollups.trend_bucket(row) for row in rows],
+    )
+
+@app.get("/export")
+async def export_analyses(
+    export_format: Literal["csv", "parquet"] = Query("csv", alias="format"),
+    sentiment: Optional[Literal["positive", "negative", "neutral"]] = None,
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_user),
+):
+    """Stream the current user's analyses, oldest first, as CSV or Parquet
+
+    Rows come from a server-side cursor a batch at a time, so memory use
+    does not grow with the size of the export.
+    """
+    if export_format == "parquet" and not export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export needs pyarrow installed on the server",
+        )
+    logger.info("Export (%s) request from user: %s", export_format, current_user.id)
+    query = export.export_query(
+        current_user.id,
+        sentiment=sentiment,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        since=since,
+        until=until,
+    )
+    stream = export.stream_parquet(query) if export_format == "parquet" else export.stream_csv(query)
+    filename = f"sentiment-analyses-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    # A sync iterator, so Starlette pulls each batch on the threadpool
+    return StreamingResponse(
+        stream,
+        media_type=export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @app.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
-    logger.info(f"User profile request from user: {current_user.email}")
+async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
+    logger.debug("User profile request from user: %s", current_user.id)
     return current_user
 
 # Public endpoint for sentiment analysis without authentication
-@app.post("/analyze-public", response_model=schemas.SentimentResponse)
+@app.post("/analyze-public", response_model=schemas.SentimentResponse, dependencies=[require_model])
 async def analyze_sentiment_public(
-    request: schemas.SentimentRequest,
-    db: Session = Depends(get_db)
+    request: schemas.SentimentRequest
 ):
-    logger.info(f"Public sentiment analysis request")
+    logger.info("Public sentiment analysis request", extra=logging_config.SAMPLED)
     # Perform sentiment analysis
-    sentiment, confidence = sentiment_analyzer.analyze(request.text)
+    sentiment, confidence = await runtime.batcher.submit(request.text)
     
-    # Create database record
-    db_analysis = models.SentimentAnalysis(
-        text=request.text,
-        sentiment=sentiment,
-        confidence=confidence
-    )
-    db.add(db_analysis)
-    db.commit()
-    db.refresh(db_analysis)
+    # Queue the database record; see PERSIST_MODE for when this returns
+    await runtime.writer.record({
+        "text": request.text,
+        "sentiment": sentiment,
+        "confidence": confidence,
+    })
     
     # Return response
     return schemas.SentimentResponse(
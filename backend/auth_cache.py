@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import ValidationError
+
+import schemas
+
+# Seconds a looked-up user is reused before Postgres is asked again (0 disables)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Build the user straight from the signed token's claims, skipping the lookup
+AUTH_TRUST_JWT_CLAIMS = os.getenv("AUTH_TRUST_JWT_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+
+def token_claims(user) -> dict:
+    """Claims that let a token stand in for a user lookup"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+    }
+
+
+def principal_from_claims(payload: dict) -> Optional[schemas.User]:
+    """Rebuild the user from token claims, or None for tokens issued without them"""
+    try:
+        return schemas.User(id=payload["uid"], email=payload["sub"], created_at=payload["created_at"])
+    except (KeyError, ValidationError):
+        return None
+
+
+class UserCache:
+    """Short-lived cache of authenticated users keyed by token subject"""
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_size: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str) -> Optional[schemas.User]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(subject)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(subject, None)
+            self.misses += 1
+            return None
+
+    def put(self, subject: str, user: schemas.User):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        """Forget a user after any change to their account"""
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "trust_jwt_claims": AUTH_TRUST_JWT_CLAIMS,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
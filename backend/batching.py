@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+import metrics
+from inference_pool import InferencePool, InferenceQueueFull
+from prediction_cache import PredictionCache
+from sentiment_model import FALLBACK_PREDICTION
+
+logger = logging.getLogger(__name__)
+
+# Coalescing window: a batch is dispatched once it holds BATCH_MAX_SIZE texts
+# or BATCH_MAX_WAIT_MS has passed since its first text arrived
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Number of recent wait times kept for percentile stats
+STATS_WINDOW = 1024
+
+
+class BatcherStopped(InferenceQueueFull):
+    """Raised to requests still waiting for a batch when the batcher stops
+
+    Answered like a full queue, with a 503 the client can retry elsewhere.
+    """
+
+
+class MicroBatcher:
+    """Collects concurrent analyze requests and runs them as one forward pass"""
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[str], Optional[dict]], List[Tuple[str, float]]],
+        pool: Optional[InferencePool] = None,
+        cache: Optional[PredictionCache] = None,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        self.predict_batch = predict_batch
+        self.pool = pool or InferencePool()
+        self.cache = cache
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._inflight = set()
+
+        # Stats
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._wait_times = deque(maxlen=STATS_WINDOW)
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+
+    async def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            # One in-flight batch per pool worker; while all are busy new
+            # requests keep accumulating into the next, larger batch
+            self._slots = asyncio.Semaphore(self.pool.workers)
+            self._worker = asyncio.create_task(self._run())
+            logger.info(
+                f"Micro-batcher started (max_batch_size={self.max_batch_size}, "
+                f"max_wait_ms={self.max_wait * 1000:g})"
+            )
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            # Batches already in the pool finish; nothing queued behind them will run
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+            error = BatcherStopped("Inference batcher stopped")
+            while not self._queue.empty():
+                _, future, _, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(error)
+
+    async def submit(self, text: str) -> Tuple[str, float]:
+        """Queue a text for the next batch and wait for its prediction
+
+        Cached predictions are returned without touching the model. Raises
+        InferenceQueueFull straight away when the pool is saturated.
+        """
+        if self.cache is not None:
+            with metrics.stage("cache"):
+                cached = await self.cache.lookup(text)
+            if cached is not None:
+                return cached
+
+        await self.start()
+        self.pool.reserve()
+        try:
+            future = asyncio.get_running_loop().create_future()
+            # The batch runs in another task; it reports its stages into this request's timings
+            await self._queue.put((text, future, time.perf_counter(), metrics.current_timings()))
+            result = await future
+        finally:
+            self.pool.release()
+
+        if self.cache is not None and result != FALLBACK_PREDICTION:
+            self.cache.put(text, result)
+        return result
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            batch.append(await self._queue.get())
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Stopped while collecting: requeue the batch so stop() fails it
+            for item in batch:
+                self._queue.put_nowait(item)
+            raise
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            # Drop requests whose callers have gone away
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            started = time.perf_counter()
+            self._record(batch, started)
+            texts = [text for text, _, _, _ in batch]
+            # Filled with the batch's tokenize and forward times by predict_batch
+            batch_timings = {}
+            try:
+                results = await self.pool.run(self.predict_batch, texts, batch_timings)
+            except Exception as e:
+                logger.error(f"Batch inference failed: {str(e)}", exc_info=True)
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            metrics.observe_stage("inference", time.perf_counter() - started, batch_timings)
+
+            # Every request in the batch waited for the whole batch
+            for (_, future, _, timings), result in zip(batch, results):
+                if timings is not None:
+                    for name, seconds in batch_timings.items():
+                        timings[name] = timings.get(name, 0.0) + seconds
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _record(self, batch, started):
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._max_batch_seen = max(self._max_batch_seen, size)
+        self._batch_sizes.append(size)
+        metrics.BATCH_SIZE.observe(size)
+        for _, _, enqueued, timings in batch:
+            self._wait_times.append(started - enqueued)
+            metrics.observe_stage("queue", started - enqueued, timings)
+
+    def stats(self) -> dict:
+        """Return queue depth, batch size and wait-time statistics"""
+        waits = sorted(self._wait_times)
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000
+
+        recent_sizes = list(self._batch_sizes)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "recent_avg_batch_size": sum(recent_sizes) / len(recent_sizes) if recent_sizes else 0.0,
+            "largest_batch": self._max_batch_seen,
+            "wait_ms_p50": percentile(0.50),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_p99": percentile(0.99),
+            "wait_ms_max": waits[-1] * 1000 if waits else 0.0,
+            "pool": self.pool.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
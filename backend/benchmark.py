@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Single-token words in the uncased BERT vocabulary, so a text of n words
+# encodes to n tokens plus the special tokens
+WORDS = (
+    "the product works great and i would buy it again but shipping was slow "
+    "quality price service good bad love hate fast never always very not "
+    "really bought box arrived broken perfect recommend return money worth"
+).split()
+SEED = 1234
+
+
+def make_texts(count: int, tokens: int, seed=SEED) -> List[str]:
+    """Reproducible texts of `tokens` tokens each, special tokens included"""
+    rng = random.Random(f"{seed}:{count}:{tokens}")
+    return [" ".join(rng.choice(WORDS) for _ in range(max(1, tokens - 2))) for _ in range(count)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(name: str, params: dict, latencies: List[float], items: int, elapsed: float, errors: int = 0) -> dict:
+    """Result row; latencies are seconds per call, items the texts processed in `elapsed` seconds"""
+    return {
+        "name": name,
+        **params,
+        "calls": len(latencies),
+        "errors": errors,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def environment() -> dict:
+    import torch
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "model_path": os.getenv("MODEL_PATH", "../model/fine_tuned_model"),
+    }
+
+
+def run_model_benchmark(args) -> List[dict]:
+    """SentimentAnalyzer.analyze_batch across backends, thread counts, batch sizes and lengths"""
+    import torch
+
+    import sentiment_model
+
+    results = []
+    for backend in args.backends:
+        for threads in args.threads:
+            # Read by SentimentAnalyzer when it loads, so set them per configuration
+            sentiment_model.MODEL_BACKEND = backend
+            sentiment_model.INFERENCE_THREADS = threads
+            torch.set_num_threads(threads)
+            analyzer = sentiment_model.SentimentAnalyzer()
+            if analyzer.backend != backend:
+                print(f"Skipping {backend}: it fell back to {analyzer.backend}", file=sys.stderr)
+                continue
+            for seq_length in args.seq_lengths:
+                for batch_size in args.batch_sizes:
+                    texts = make_texts(batch_size, seq_length)
+                    for _ in range(args.warmup):
+                        analyzer.analyze_batch(texts)
+                    latencies, errors = [], 0
+                    started = time.perf_counter()
+                    for _ in range(args.iterations):
+                        call_started = time.perf_counter()
+                        predictions = analyzer.analyze_batch(texts)
+                        latencies.append(time.perf_counter() - call_started)
+                        # analyze_batch answers the fallback prediction when inference fails
+                        errors += sum(1 for p in predictions if p is sentiment_model.FALLBACK_PREDICTION)
+                    elapsed = time.perf_counter() - started
+                    params = {
+                        "mode": "model", "backend": backend, "threads": threads,
+                        "batch_size": batch_size, "seq_length": seq_length,
+                        # Longer texts are truncated to this, as in serving
+                        "max_seq_length": sentiment_model.MAX_SEQ_LENGTH,
+                    }
+                    name = f"model/{backend}/threads={threads}/batch={batch_size}/seq={seq_length}"
+                    result = summarize(name, params, latencies, batch_size * args.iterations, elapsed, errors)
+                    results.append(result)
+                    print_result(result)
+            del analyzer
+    return results
+
+
+async def _http_scenario(client, name: str, path: str, headers: dict, texts: List[str], concurrency: int,
+                         seq_length: int) -> dict:
+    queue = asyncio.Queue()
+    for text in texts:
+        queue.put_nowait(text)
+    latencies, statuses = [], {}
+
+    async def worker():
+        while True:
+            try:
+                text = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.post(path, json={"text": text}, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    params = {"mode": "http", "endpoint": path, "concurrency": concurrency, "seq_length": seq_length}
+    result = summarize(name, params, latencies, len(texts), elapsed, errors)
+    result["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+async def _run_http(args) -> List[dict]:
+    import httpx
+
+    from app import app
+
+    # ASGITransport does not send lifespan events, so start the runtime directly
+    await app.router.startup()
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            credentials = {"email": "benchmark@example.com", "password": "benchmark-password"}
+            await client.post("/register", json=credentials)
+            response = await client.post("/token", data={"username": credentials["email"], "password": credentials["password"]})
+            response.raise_for_status()
+            auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            for endpoint in args.endpoints:
+                headers = auth if endpoint == "analyze" else {}
+                for concurrency in args.concurrency:
+                    for seq_length in args.seq_lengths:
+                        name = f"http/{endpoint}/concurrency={concurrency}/seq={seq_length}"
+                        # Distinct texts per run so the prediction cache does not answer them
+                        if args.warmup:
+                            warmup_texts = make_texts(args.warmup, seq_length, seed=f"{SEED}:warmup:{name}")
+                            await _http_scenario(client, "warmup", f"/{endpoint}", headers, warmup_texts,
+                                                 concurrency, seq_length)
+                        texts = make_texts(args.requests, seq_length, seed=f"{SEED}:{name}")
+                        result = await _http_scenario(client, name, f"/{endpoint}", headers, texts,
+                                                      concurrency, seq_length)
+                        results.append(result)
+                        print_result(result)
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def run_http_benchmark(args) -> List[dict]:
+    """Load-test the FastAPI app in process, with SQLite standing in for Postgres"""
+    # database.py reads these on import, so they must be set before the app is loaded
+    database_dir = tempfile.mkdtemp(prefix="benchmark-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(database_dir, 'benchmark.db')}"
+    os.environ.setdefault("STARTUP_MODE", "eager")
+    os.environ.setdefault("DB_ASYNC", "false")
+    return asyncio.run(_run_http(args))
+
+
+def print_result(result: dict):
+    errors = f", {result['errors']} errors" if result["errors"] else ""
+    print(
+        f"{result['name']:<60} {result['throughput']:>9.1f}/s  p50 {result['p50_ms']:>8.2f}ms  "
+        f"p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms{errors}"
+    )
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of results against the baseline: lower throughput or higher p95 beyond tolerance"""
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('environment', {}).get('timestamp', 'unknown')}:")
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            print(f"  {result['name']}: not in baseline")
+            continue
+        throughput_change = result["throughput"] / before["throughput"] - 1 if before["throughput"] else 0.0
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        failed = throughput_change < -tolerance or p95_change > tolerance or result["errors"] > before.get("errors", 0)
+        print(f"  {'REGRESSION' if failed else 'ok':<10} {result['name']:<60} "
+              f"throughput {throughput_change:>+7.1%}  p95 {p95_change:>+7.1%}")
+        if failed:
+            regressions.append(result["name"])
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def str_list(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark sentiment inference and the API")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this results file and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed throughput drop / p95 rise against the baseline (default 0.10)")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    model_parser = modes.add_parser("model", help="SentimentAnalyzer.analyze_batch directly")
+    model_parser.add_argument("--backends", type=str_list, default=["pytorch"], help="e.g. pytorch,pytorch_int8,onnx")
+    model_parser.add_argument("--threads", type=int_list, default=[os.cpu_count() or 1])
+    model_parser.add_argument("--batch-sizes", type=int_list, default=[1, 8, 32])
+    model_parser.add_argument("--seq-lengths", type=int_list, default=[32, 128, 512])
+    model_parser.add_argument("--iterations", type=int, default=20)
+    model_parser.add_argument("--warmup", type=int, default=3)
+
+    http_parser = modes.add_parser("http", help="the FastAPI app through an in-process ASGI client")
+    http_parser.add_argument("--endpoints", type=str_list, default=["analyze-public", "analyze"])
+    http_parser.add_argument("--concurrency", type=int_list, default=[1, 16])
+    http_parser.add_argument("--seq-lengths", type=int_list, default=[64])
+    http_parser.add_argument("--requests", type=int, default=500)
+    http_parser.add_argument("--warmup", type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    # Loading the baseline first means a bad path fails before a long run
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = run_model_benchmark(args) if args.mode == "model" else run_http_benchmark(args)
+    report: Dict = {"environment": environment(), "settings": vars(args), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        if baseline.get("environment", {}).get("cpu_count") != report["environment"]["cpu_count"]:
+            print("Warning: the baseline was recorded on a machine with a different CPU count")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
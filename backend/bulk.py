@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+import schemas
+from inference_pool import InferencePool
+from persistence import AnalysisWriter
+from prediction_cache import PredictionCache
+from sentiment_model import FALLBACK_PREDICTION
+
+logger = logging.getLogger(__name__)
+
+# Most texts accepted by one /analyze-batch call
+BULK_MAX_TEXTS = int(os.getenv("BULK_MAX_TEXTS", "10000"))
+# Texts per forward pass
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "64"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def read_batch_texts(request: Request) -> List[str]:
+    """Parse texts from a JSON body ({"texts": [...]} or [...]) or an NDJSON upload"""
+    content_type = request.headers.get("content-type", "")
+    body = await request.body()
+
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            # One review per line, either a JSON string or {"text": ...}
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+            texts = [item["text"] if isinstance(item, dict) else item for item in items]
+            payload = {"texts": texts}
+        else:
+            payload = json.loads(body)
+            if isinstance(payload, list):
+                payload = {"texts": payload}
+        texts = schemas.BatchSentimentRequest.model_validate(payload).texts
+    except (ValueError, KeyError, TypeError) as e:
+        # ValidationError is a ValueError subclass
+        detail = e.errors() if isinstance(e, ValidationError) else f"Invalid batch payload: {str(e)}"
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+    if not texts:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="No texts to analyze")
+    if len(texts) > BULK_MAX_TEXTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_TEXTS} texts per batch",
+        )
+    return texts
+
+
+def reserve_chunk(pool: InferencePool) -> int:
+    """Claim pool capacity for one chunk; raises InferenceQueueFull when saturated"""
+    chunk_size = max(1, min(BULK_CHUNK_SIZE, pool.max_pending))
+    pool.reserve(chunk_size)
+    return chunk_size
+
+
+async def predict_chunk(texts: List[str], analyzer, pool: InferencePool, cache: Optional[PredictionCache]):
+    """Predict a chunk, sending only cache misses through the model"""
+    if cache is None:
+        return await pool.run(analyzer.analyze_batch, texts)
+
+    results = await cache.lookup_many(texts)
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        predicted = await pool.run(analyzer.analyze_batch, [texts[i] for i in misses])
+        for i, result in zip(misses, predicted):
+            results[i] = result
+            if result != FALLBACK_PREDICTION:
+                cache.put(texts[i], result)
+    return results
+
+
+async def stream_batch_analysis(
+    texts: List[str],
+    analyzer,
+    pool: InferencePool,
+    writer: AnalysisWriter,
+    chunk_size: int,
+    cache: Optional[PredictionCache] = None,
+    user_id: Optional[int] = None,
+):
+    """Analyze texts in length-sorted chunks, yielding NDJSON lines as each chunk completes
+
+    The caller must already hold chunk_size of pool capacity (see reserve_chunk)
+    and release it once the response is done, as batch_response does.
+    """
+    try:
+        # Similar lengths share a chunk so padding stays small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), chunk_size):
+            indices = order[start:start + chunk_size]
+            chunk = [texts[i] for i in indices]
+            results = await predict_chunk(chunk, analyzer, pool, cache)
+
+            rows = [
+                {"user_id": user_id, "text": text, "sentiment": sentiment, "confidence": confidence}
+                for text, (sentiment, confidence) in zip(chunk, results)
+            ]
+            await writer.record_many(rows)
+
+            lines = [
+                schemas.BatchSentimentResult(index=index, sentiment=sentiment, confidence=confidence).model_dump_json()
+                for index, (sentiment, confidence) in zip(indices, results)
+            ]
+            yield "\n".join(lines) + "\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Batch analysis failed: {str(e)}", exc_info=True)
+        yield json.dumps({"error": "Batch analysis failed"}) + "\n"
+
+
+class PoolStreamingResponse(StreamingResponse):
+    """Streaming response that hands its reserved pool capacity back however it ends
+
+    A BackgroundTask is skipped when sending fails part way, e.g. once the
+    client is gone, which would leak the reservation for good.
+    """
+
+    def __init__(self, content, pool: InferencePool, reserved: int, **kwargs):
+        super().__init__(content, **kwargs)
+        self.pool = pool
+        self.reserved = reserved
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.pool.release(self.reserved)
+
+
+def batch_response(
+    texts: List[str],
+    analyzer,
+    pool: InferencePool,
+    writer: AnalysisWriter,
+    cache: Optional[PredictionCache] = None,
+    user_id: Optional[int] = None,
+) -> PoolStreamingResponse:
+    """NDJSON response for /analyze-batch; raises InferenceQueueFull before anything is sent"""
+    chunk_size = reserve_chunk(pool)
+    return PoolStreamingResponse(
+        stream_batch_analysis(texts, analyzer, pool, writer, chunk_size, cache, user_id=user_id),
+        pool,
+        chunk_size,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -0,0 +1,184 @@
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import func, insert, literal, literal_column, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import models
+import rollups
+
+logger = logging.getLogger(__name__)
+
+# What get_async_db yields
+DbSession = Union[Session, AsyncSession]
+
+# Engine URL -> whether migration 0004's search column exists
+_text_search_available = {}
+
+
+async def run(db, fn, *args, **kwargs):
+    """Call fn(session, *args, **kwargs) without blocking the event loop
+
+    An AsyncSession runs it on its own connection via run_sync; a sync
+    Session is handed to the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def _get_user(db: Session, email: str) -> Optional[models.User]:
+    return db.execute(select(models.User).where(models.User.email == email)).scalars().first()
+
+
+def _add_user(db: Session, email: str, hashed_password: str) -> models.User:
+    db_user = models.User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+def _add_analyses(db: Session, rows: List[dict]):
+    db.execute(insert(models.SentimentAnalysis), rows)
+    # Same transaction, so the trend rollups never drift from the rows
+    rollups.apply_rows(db, rows)
+    db.commit()
+
+
+def _list_analyses(
+    db: Session,
+    user_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    sentiment: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[models.SentimentAnalysis]:
+    analysis = models.SentimentAnalysis
+    query = select(analysis).where(analysis.user_id == user_id)
+    if after is not None:
+        # Keyset pagination: rows strictly older than the cursor row
+        query = query.where(tuple_(analysis.created_at, analysis.id) < after)
+    if sentiment is not None:
+        query = query.where(analysis.sentiment == sentiment)
+    if min_confidence is not None:
+        query = query.where(analysis.confidence >= min_confidence)
+    if max_confidence is not None:
+        query = query.where(analysis.confidence <= max_confidence)
+    if since is not None:
+        query = query.where(analysis.created_at >= since)
+    if until is not None:
+        query = query.where(analysis.created_at < until)
+    query = query.order_by(analysis.created_at.desc(), analysis.id.desc()).limit(limit)
+    return list(db.execute(query).scalars())
+
+
+def _has_text_search(db: Session) -> bool:
+    """Whether sentiment_analyses has the text_search column of migration 0004
+
+    Checked once per engine; databases built by create_all lack it until
+    `alembic upgrade head` runs, and the app must restart to pick it up.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = bind.url.render_as_string()
+    if key not in _text_search_available:
+        found = db.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'sentiment_analyses' AND column_name = 'text_search'"
+        )).scalar() is not None
+        if not found:
+            logger.warning("sentiment_analyses has no text_search column; /search scans text until `alembic upgrade head` runs")
+        _text_search_available[key] = found
+    return _text_search_available[key]
+
+
+def _search_analyses(
+    db: Session,
+    user_id: int,
+    terms: str,
+    limit: int,
+    order: str = "rank",
+    sentiment: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    analysis = models.SentimentAnalysis
+    filters = [analysis.user_id == user_id]
+    if sentiment is not None:
+        filters.append(analysis.sentiment == sentiment)
+    if since is not None:
+        filters.append(analysis.created_at >= since)
+    if until is not None:
+        filters.append(analysis.created_at < until)
+
+    ranked = _has_text_search(db)
+    if ranked:
+        # Generated column added by migration 0004, not mapped on the model
+        document = literal_column("sentiment_analyses.text_search")
+        tsquery = func.websearch_to_tsquery("english", terms)
+        rank = func.ts_rank_cd(document, tsquery)
+        filters.append(document.op("@@")(tsquery))
+    else:
+        # SQLite, or a Postgres database migration 0004 has not run on: scan instead
+        rank = literal(1.0)
+        filters.append(analysis.text.contains(terms, autoescape=True))
+
+    ordering = [analysis.created_at.desc(), analysis.id.desc()]
+    if order == "rank" and ranked:
+        ordering.insert(0, rank.desc())
+    query = select(analysis, rank.label("rank")).where(*filters).order_by(*ordering).limit(limit)
+    return db.execute(query).all()
+
+
+async def get_user(db, email: str) -> Optional[models.User]:
+    return await run(db, _get_user, email)
+
+
+async def add_user(db, email: str, hashed_password: str) -> models.User:
+    return await run(db, _add_user, email, hashed_password)
+
+
+async def add_analyses(db, rows: List[dict]):
+    """Insert analysis rows in a single multi-row INSERT"""
+    await run(db, _add_analyses, rows)
+
+
+async def list_analyses(db, user_id: int, limit: int, **filters) -> List[models.SentimentAnalysis]:
+    """A user's analyses, newest first; see _list_analyses for the filters"""
+    return await run(db, _list_analyses, user_id, limit, **filters)
+
+
+async def search_analyses(db, user_id: int, terms: str, limit: int, **filters):
+    """(analysis, rank) pairs for a user's analyses matching a web-style search query"""
+    return await run(db, _search_analyses, user_id, terms, limit, **filters)
+
+
+async def list_rollups(db, user_id: int, granularity: str, since: datetime, until: datetime, limit: int):
+    return await run(db, rollups.list_rollups, user_id, granularity, since, until, limit)
+
+
+async def release(db):
+    """End the session's transaction and return its connection to the pool
+
+    The session stays usable; its next query checks out a connection again.
+    Loaded objects keep their attribute values.
+    """
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+
+async def rollback(db):
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
@@ -1,8 +1,14 @@
 import urllib.parse
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 import os
 import urllib.parse
 
@@ -18,23 +24,154 @@ DB_NAME = os.getenv("POSTGRES_DB", "sentiment_db")
 # URL encode the password to handle special characters
 encoded_password = urllib.parse.quote_plus(DB_PASSWORD)
 
-# Construct the database URL
-DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Construct the database URL (DATABASE_URL overrides, e.g. sqlite for local runs)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
 
-print(f"Connecting to database: {DB_HOST}:{DB_PORT}/{DB_NAME}")
-print(f"Using connection string: {DATABASE_URL}")
+# Some hosts (Render, Heroku) hand out postgres:// URLs, which SQLAlchemy 2 rejects
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
 
-try:
-    engine = create_engine(DATABASE_URL)
-    # Test connection
-    with engine.connect() as connection:
-        print("Database connection successful!")
-except Exception as e:
-    print(f"Database connection error: {str(e)}")
-    raise
+# Connection pool sizing: DB_POOL_SIZE kept open, plus up to DB_MAX_OVERFLOW
+# opened on demand; a checkout waits DB_POOL_TIMEOUT seconds before failing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Seconds before a connection is replaced, to stay under server/proxy idle limits
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection on checkout so a restarted Postgres does not fail requests
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Serve request queries through SQLAlchemy's asyncio extension (asyncpg)
+# instead of sync sessions on the threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Async drivers for each sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Number of recent checkout waits kept for stats
+STATS_WINDOW = 1024
+
+
+class PoolStats:
+    """Checkout wait times and connection lifecycle counts for the engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=STATS_WINDOW)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+            self.checkouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000
+
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "wait_ms_p50": percentile(0.50),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": waits[-1] * 1000 if waits else 0.0,
+        }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def _engine_options(url: str, poolclass=TimedQueuePool) -> dict:
+    # SQLite uses its own single-file pools, which take none of these settings
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Creating the engine does not connect; the first query (or check_connection) does
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+print(f"Connecting to database: {engine.url.render_as_string(hide_password=True)}")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine shares the pool settings; asyncpg is only needed with DB_ASYNC
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        async_url(DATABASE_URL), **_engine_options(DATABASE_URL, TimedAsyncQueuePool)
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    print("Using async database sessions")
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.connects += 1
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.invalidations += 1
+
+
+for _engine in (engine, async_engine.sync_engine if async_engine is not None else None):
+    if _engine is not None:
+        event.listen(_engine, "connect", _on_connect)
+        event.listen(_engine, "invalidate", _on_invalidate)
+
 Base = declarative_base()
 
 def get_db():
@@ -42,4 +179,51 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
+        db.close()
+
+async def get_async_db():
+    """Request session: an AsyncSession with DB_ASYNC, otherwise a sync Session
+
+    Query it through the helpers in crud.py, which work with either.
+    """
+    if AsyncSessionLocal is None:
+        # Closing rolls back on the connection, so it runs in the threadpool
+        # like the queries themselves; creating the session opens nothing yet
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def check_connection():
+    """Open and close one connection, raising if the database is unreachable"""
+    try:
+        with engine.connect() as connection:
+            print("Database connection successful!")
+    except Exception as e:
+        print(f"Database connection error: {str(e)}")
+        raise
+
+def get_pool_stats() -> dict:
+    """Current pool occupancy plus checkout wait times"""
+    pool = async_engine.sync_engine.pool if async_engine is not None else engine.pool
+    stats = {"pool": type(pool).__name__, "async": DB_ASYNC}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout_seconds": DB_POOL_TIMEOUT,
+        })
+    stats.update(pool_stats.snapshot())
+    return stats
+
+async def dispose_async_engine():
+    """Close the async pool's connections on shutdown"""
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,133 @@
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+import models
+from database import SessionLocal
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor; also the size
+# of each CSV chunk and Parquet row group sent to the client
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
+EXPORT_COLUMNS = ("id", "created_at", "sentiment", "confidence", "text")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def export_query(
+    user_id: int,
+    sentiment: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    analysis = models.SentimentAnalysis
+    query = select(*(getattr(analysis, column) for column in EXPORT_COLUMNS)).where(analysis.user_id == user_id)
+    if sentiment is not None:
+        query = query.where(analysis.sentiment == sentiment)
+    if min_confidence is not None:
+        query = query.where(analysis.confidence >= min_confidence)
+    if max_confidence is not None:
+        query = query.where(analysis.confidence <= max_confidence)
+    if since is not None:
+        query = query.where(analysis.created_at >= since)
+    if until is not None:
+        query = query.where(analysis.created_at < until)
+    return query.order_by(analysis.created_at, analysis.id)
+
+
+def iter_batches(query, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[list]:
+    """Yield lists of result rows from a server-side cursor, holding one batch at a time"""
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(stream_results=True, yield_per=batch_rows))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def stream_csv(query, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_batches(query, batch_rows):
+        writer.writerows(
+            (id, created_at.isoformat(), sentiment, confidence, text)
+            for id, created_at, sentiment, confidence, text in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands its bytes over each time it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(query, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """One Parquet row group per batch, flushed to the client as soon as it is written"""
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("created_at", pyarrow.timestamp("us", tz="UTC")),
+        ("sentiment", pyarrow.string()),
+        ("confidence", pyarrow.float64()),
+        ("text", pyarrow.string()),
+    ])
+    sink = _DrainableSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in iter_batches(query, batch_rows):
+            columns = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        # Writes the footer
+        writer.close()
+    yield sink.drain()
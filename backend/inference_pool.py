@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Threads that run forward passes; each one can hold one batch at a time
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# torch intra-op threads per forward pass (0 keeps torch's default)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# Texts allowed to wait for or be in inference before new ones are rejected
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "256"))
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue cannot take more work"""
+
+
+class InferencePool:
+    """Bounded executor that keeps blocking model calls off the event loop"""
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        threads: int = INFERENCE_THREADS,
+        max_pending: int = INFERENCE_MAX_QUEUE,
+    ):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+        self._rejected = 0
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        logger.info(
+            f"Inference pool ready (workers={self.workers}, torch_threads={torch.get_num_threads()}, "
+            f"max_pending={self.max_pending})"
+        )
+
+    def reserve(self, count: int = 1):
+        """Claim queue capacity for count texts or raise InferenceQueueFull"""
+        # Only called from the event loop thread, so no lock is needed
+        if self._pending + count > self.max_pending:
+            self._rejected += count
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self._pending}/{self.max_pending} pending)"
+            )
+        self._pending += count
+
+    def release(self, count: int = 1):
+        self._pending = max(0, self._pending - count)
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "torch_threads": torch.get_num_threads(),
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self._rejected,
+        }
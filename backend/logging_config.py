@@ -0,0 +1,177 @@
+import atexit
+import contextvars
+import copy
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from typing import Optional
+
+# "text" for the classic one-line format, "json" for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fraction of the per-request info logs (those passed extra=SAMPLED) that are kept
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+# Hand records to a background thread so request handlers never wait on log I/O
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() in ("1", "true", "yes")
+# Records held for the log thread before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+REQUEST_ID_HEADER = "x-request-id"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+# Marks a high-volume info log as one LOG_SAMPLE_RATE may drop
+SAMPLED = {"sampled": True}
+
+# Id of the request being handled, attached to every record logged while handling it
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class UserRef:
+    """Short stable hash of an email, to correlate log lines without logging
+    the address; only computed if a line using it is actually emitted"""
+
+    __slots__ = ("email",)
+
+    def __init__(self, email: str):
+        self.email = email
+
+    def __str__(self):
+        return hashlib.sha256(self.email.strip().lower().encode()).hexdigest()[:12]
+
+
+def user_ref(email: str) -> UserRef:
+    return UserRef(email)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the id of the request being handled"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps rate of the info records marked SAMPLED, and every other record"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, "sampled", False) and record.levelno <= logging.INFO:
+            return self.rate >= 1.0 or random.random() < self.rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller when the queue is full
+
+    The root handler also receives library records (SQLAlchemy, uvicorn,
+    httpx) whose args may be mutable objects, so prepare() renders the
+    message and any traceback to text on the caller, as the stock handler
+    does, and hands the listener a copy holding only plain values. Layout
+    (text or JSON) is still applied on the listener thread.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._traceback_formatter.formatException(record.exc_info)
+            # Drop the traceback object so its frames are not kept alive in the queue
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropping a log line beats blocking the event loop on a slow disk
+            pass
+
+
+def configure_logging():
+    """Install the root handler once; later calls are no-ops"""
+    global _listener
+    root = logging.getLogger()
+    if getattr(root, "_reviewsense_configured", False):
+        return
+    root._reviewsense_configured = True
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    if LOG_QUEUE:
+        handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        handler = output
+    # Filters on the root handler run in the logging caller, where the request id is set
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+
+class RequestIdMiddleware:
+    """Gives every HTTP request an id, taken from X-Request-ID or generated,
+    and echoes it in the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = _request_id.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,222 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Serve /metrics and count every request; stage timers fill the histograms either way
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Add a Server-Timing header with the stage breakdown to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+PREFIX = "reviewsense"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from sub-millisecond cache lookups to slow commits
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Stage durations of the request being handled, read into its Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative buckets, sum and count per label set"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.labels, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    f"{PREFIX}_stage_seconds",
+    "Time spent in each stage of request handling (auth, cache, queue, tokenize, forward, inference, persist, db_write)",
+    labels=("stage",),
+)
+REQUESTS = Counter(f"{PREFIX}_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+REQUEST_SECONDS = Histogram(f"{PREFIX}_http_request_seconds", "HTTP request duration by route", ("route", "method"))
+BATCH_SIZE = Histogram(f"{PREFIX}_inference_batch_size", "Texts per model forward batch", buckets=BATCH_SIZE_BUCKETS)
+DB_WRITE_ROWS = Histogram(f"{PREFIX}_db_write_rows", "Analysis rows per database write", buckets=BATCH_SIZE_BUCKETS)
+
+_metrics = [STAGE_SECONDS, REQUESTS, REQUEST_SECONDS, BATCH_SIZE, DB_WRITE_ROWS]
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+_CURRENT_REQUEST = object()
+
+
+def observe_stage(stage: str, seconds: float, timings=_CURRENT_REQUEST):
+    """Record a stage in the histogram and in the Server-Timing of the current request
+
+    Code running outside the request's context (batch tasks, worker threads)
+    passes the request's timings dict explicitly, or None for no request.
+    """
+    STAGE_SECONDS.observe(seconds, stage)
+    if timings is _CURRENT_REQUEST:
+        timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    """The Server-Timing dict of the request being handled, to fill from other tasks or threads"""
+    return _request_timings.get()
+
+
+def register_collector(collect: Callable[[], Iterable[str]]):
+    """Add a function returning exposition lines, called on every scrape"""
+    _collectors.append(collect)
+
+
+def stats_gauges(name: str, stats: Optional[dict], help: str) -> List[str]:
+    """Numeric fields of a /*-stats dict as gauges named <prefix>_<name>_<field>, nested dicts flattened"""
+    lines = []
+
+    def walk(prefix: str, values: dict):
+        for key, value in values.items():
+            metric = f"{prefix}_{key}"
+            if isinstance(value, dict):
+                walk(metric, value)
+            elif isinstance(value, (bool, int, float)):
+                lines.append(f"# HELP {metric} {help}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {float(value):g}")
+
+    if stats:
+        walk(f"{PREFIX}_{name}", stats)
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+def _route_label(scope) -> str:
+    """Route template of the matched endpoint, so /history?cursor=... counts as /history"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    app = scope.get("app")
+    routes = getattr(app, "_metrics_route_paths", None)
+    if routes is None and app is not None:
+        routes = {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+        app._metrics_route_paths = routes
+    return (routes or {}).get(endpoint, endpoint.__name__)
+
+
+class MetricsMiddleware:
+    """Counts and times every HTTP request and adds a Server-Timing header
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streamed responses pass
+    through untouched and handlers share the request's context variables.
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    # Stages finished before the headers went out; streamed
+                    # bodies keep running after this and are not included
+                    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+                    entries.append(f"total;dur={(time.perf_counter() - started) * 1000:.2f}")
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", ", ".join(entries).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            route = _route_label(scope)
+            REQUESTS.inc(route, scope["method"], str(status))
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route, scope["method"])
@@ -0,0 +1,47 @@
+"""Baseline: users and sentiment_analyses as created by create_all
+
+Databases created before migrations existed already have these tables;
+they are left untouched, so `alembic upgrade head` is safe on them too.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-04-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "sentiment_analyses" not in existing:
+        op.create_table(
+            "sentiment_analyses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.Column("sentiment", sa.String(10), nullable=False),
+            sa.Column("confidence", sa.Float(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+        op.create_index("ix_sentiment_analyses_id", "sentiment_analyses", ["id"])
+
+
+def downgrade():
+    op.drop_table("sentiment_analyses")
+    op.drop_table("users")
@@ -0,0 +1,153 @@
+"""Partition sentiment_analyses by month; add user_id, text_hash and indexes
+
+On Postgres the table is rebuilt as a range-partitioned table with one
+partition per calendar month (UTC) of created_at, plus a default partition
+for anything outside the prepared range. Existing rows are copied in this
+migration's transaction, so on a large table run it in a maintenance window.
+Later partitions are created (and old ones dropped) by partitions.py.
+
+Other databases (SQLite for local runs) only get the new columns and indexes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-04-01
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Months prepared past the current one
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ("ix_sentiment_analyses_user_id_created_at", ["user_id", "created_at"]),
+    ("ix_sentiment_analyses_sentiment_created_at", ["sentiment", "created_at"]),
+    ("ix_sentiment_analyses_text_hash", ["text_hash"]),
+]
+
+
+def add_months(month: date, n: int) -> date:
+    years, month_index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"sentiment_analyses_p{month:%Y_%m}"
+
+
+def create_indexes(existing=()):
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, "sentiment_analyses", columns)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # Tables created by create_all from the current models already have the columns
+    columns = {column["name"] for column in inspector.get_columns("sentiment_analyses")}
+
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table("sentiment_analyses") as batch:
+            if "user_id" not in columns:
+                batch.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+                batch.create_foreign_key(
+                    "sentiment_analyses_user_id_fkey", "users", ["user_id"], ["id"], ondelete="SET NULL"
+                )
+            if "text_hash" not in columns:
+                batch.add_column(sa.Column("text_hash", sa.String(64), nullable=True))
+        create_indexes({index["name"] for index in inspector.get_indexes("sentiment_analyses")})
+        return
+
+    # Keep the id sequence, widened, for the new table
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq AS bigint")
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE sentiment_analyses_partitioned (
+            id BIGINT NOT NULL DEFAULT nextval('sentiment_analyses_id_seq'),
+            user_id INTEGER,
+            text TEXT NOT NULL,
+            text_hash VARCHAR(64),
+            sentiment VARCHAR(10) NOT NULL,
+            confidence DOUBLE PRECISION NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT sentiment_analyses_partitioned_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT sentiment_analyses_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE SET NULL
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    # One partition per month from the oldest row through MONTHS_AHEAD from now
+    now = datetime.now(timezone.utc)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM sentiment_analyses")).scalar()
+    oldest = oldest.astimezone(timezone.utc) if oldest is not None else now
+    month = date(oldest.year, oldest.month, 1)
+    last = add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF sentiment_analyses_partitioned "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{add_months(month, 1)} 00:00:00+00')"
+        )
+        month = add_months(month, 1)
+    op.execute("CREATE TABLE sentiment_analyses_default PARTITION OF sentiment_analyses_partitioned DEFAULT")
+
+    user_id = "user_id" if "user_id" in columns else "NULL"
+    text_hash = "encode(sha256(convert_to(text, 'UTF8')), 'hex')"
+    if "text_hash" in columns:
+        text_hash = f"COALESCE(text_hash, {text_hash})"
+    op.execute(f"""
+        INSERT INTO sentiment_analyses_partitioned (id, user_id, text, text_hash, sentiment, confidence, created_at)
+        SELECT id, {user_id}, text, {text_hash}, sentiment, confidence, COALESCE(created_at, now())
+        FROM sentiment_analyses
+    """)
+
+    op.execute("DROP TABLE sentiment_analyses")
+    op.execute("ALTER TABLE sentiment_analyses_partitioned RENAME TO sentiment_analyses")
+    op.execute(
+        "ALTER TABLE sentiment_analyses RENAME CONSTRAINT sentiment_analyses_partitioned_pkey "
+        "TO sentiment_analyses_pkey"
+    )
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq OWNED BY sentiment_analyses.id")
+    # Indexes on the parent are created on every partition, present and future
+    create_indexes()
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="sentiment_analyses")
+    if bind.dialect.name != "postgresql":
+        with op.batch_alter_table("sentiment_analyses") as batch:
+            batch.drop_constraint("sentiment_analyses_user_id_fkey", type_="foreignkey")
+            batch.drop_column("text_hash")
+            batch.drop_column("user_id")
+        return
+
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE sentiment_analyses_plain (
+            id INTEGER NOT NULL DEFAULT nextval('sentiment_analyses_id_seq'),
+            text TEXT NOT NULL,
+            sentiment VARCHAR(10) NOT NULL,
+            confidence DOUBLE PRECISION NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            CONSTRAINT sentiment_analyses_plain_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO sentiment_analyses_plain (id, text, sentiment, confidence, created_at)
+        SELECT id, text, sentiment, confidence, created_at FROM sentiment_analyses
+    """)
+    # Dropping the partitioned table drops its partitions
+    op.execute("DROP TABLE sentiment_analyses")
+    op.execute("ALTER TABLE sentiment_analyses_plain RENAME TO sentiment_analyses")
+    op.execute("ALTER TABLE sentiment_analyses RENAME CONSTRAINT sentiment_analyses_plain_pkey TO sentiment_analyses_pkey")
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq AS integer")
+    op.execute("ALTER SEQUENCE sentiment_analyses_id_seq OWNED BY sentiment_analyses.id")
+    op.create_index("ix_sentiment_analyses_id", "sentiment_analyses", ["id"])
@@ -0,0 +1,73 @@
+"""Add sentiment_rollups: per-user hourly and daily counts for /trends
+
+On Postgres the rollups are backfilled from existing analyses here; on
+other databases run `python rollups.py` once after upgrading.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-04-08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COUNTERS = """
+    count(*),
+    count(*) FILTER (WHERE sentiment = 'positive'),
+    count(*) FILTER (WHERE sentiment = 'negative'),
+    count(*) FILTER (WHERE sentiment = 'neutral'),
+    sum(confidence),
+    count(*) FILTER (WHERE confidence < 0.6),
+    count(*) FILTER (WHERE confidence >= 0.6 AND confidence < 0.7),
+    count(*) FILTER (WHERE confidence >= 0.7 AND confidence < 0.8),
+    count(*) FILTER (WHERE confidence >= 0.8 AND confidence < 0.9),
+    count(*) FILTER (WHERE confidence >= 0.9)
+"""
+
+
+def upgrade():
+    # Databases the app has already started against got the table from create_all
+    existing = "sentiment_rollups" in sa.inspect(op.get_bind()).get_table_names()
+    if not existing:
+        op.create_table(
+            "sentiment_rollups",
+            sa.Column("user_id", sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column("granularity", sa.String(4), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("positive", sa.Integer(), nullable=False),
+            sa.Column("negative", sa.Integer(), nullable=False),
+            sa.Column("neutral", sa.Integer(), nullable=False),
+            sa.Column("confidence_sum", sa.Float(), nullable=False),
+            sa.Column("confidence_50", sa.Integer(), nullable=False),
+            sa.Column("confidence_60", sa.Integer(), nullable=False),
+            sa.Column("confidence_70", sa.Integer(), nullable=False),
+            sa.Column("confidence_80", sa.Integer(), nullable=False),
+            sa.Column("confidence_90", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("user_id", "granularity", "bucket_start"),
+        )
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    if existing:
+        # Counts kept by the app so far may miss rows written before it started
+        # keeping them; recompute them all
+        op.execute("DELETE FROM sentiment_rollups")
+    # Buckets are UTC hours and days, as rollups.bucket_start computes them
+    for granularity in ("hour", "day"):
+        op.execute(f"""
+            INSERT INTO sentiment_rollups
+            SELECT COALESCE(user_id, 0), '{granularity}',
+                   date_trunc('{granularity}', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                   {COUNTERS}
+            FROM sentiment_analyses
+            GROUP BY 1, 3
+        """)
+
+
+def downgrade():
+    op.drop_table("sentiment_rollups")
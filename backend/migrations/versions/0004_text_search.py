@@ -0,0 +1,52 @@
+"""Full-text search over sentiment_analyses.text
+
+Adds a stored tsvector column generated from text, so Postgres keeps it
+current on every insert, and a GIN index on (user_id, text_search) that
+answers one user's search without touching other users' rows. Adding a
+stored column rewrites the table; run it in a quiet period on a large one.
+
+Postgres only; /search falls back to a LIKE scan on other databases, and
+on Postgres databases this migration has not been run on.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-04-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    bind = op.get_bind()
+    op.execute("""
+        ALTER TABLE sentiment_analyses
+        ADD COLUMN IF NOT EXISTS text_search tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED
+    """)
+    # btree_gin lets the integer user_id share the GIN index (a trusted
+    # extension since Postgres 13); without it index the text alone
+    has_btree_gin = bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gin'"
+    )).scalar()
+    if has_btree_gin:
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        columns = "user_id, text_search"
+    else:
+        columns = "text_search"
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_sentiment_analyses_text_search
+        ON sentiment_analyses USING GIN ({columns})
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX ix_sentiment_analyses_text_search")
+    op.execute("ALTER TABLE sentiment_analyses DROP COLUMN text_search")
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached document is served before the files behind it are stat()ed again
+METADATA_CHECK_INTERVAL = float(os.getenv("METADATA_CHECK_INTERVAL", "5"))
+# Cache-Control max-age sent with /model-info and /model-metrics
+METADATA_MAX_AGE = int(os.getenv("METADATA_MAX_AGE", "60"))
+CACHE_CONTROL = f"private, max-age={METADATA_MAX_AGE}"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Evaluation runs recorded by model/eval_store.py; the newest one is served
+EVAL_STORE_PATH = os.getenv("EVAL_STORE_PATH", os.path.join(REPO_ROOT, "evaluation", "runs.jsonl"))
+
+# Served when neither evaluation results nor model_info.json are available
+SAMPLE_METRICS = {"accuracy": 0.9245, "f1": 0.9187, "precision": 0.9312, "recall": 0.9065}
+
+Build = Callable[[], Tuple[dict, List[str]]]
+
+
+def model_info_path() -> str:
+    return os.path.join(os.getenv("MODEL_PATH", "../model/fine_tuned_model"), "model_info.json")
+
+
+def read_latest_run(path: str) -> Optional[dict]:
+    """Newest run in the append-only runs file, i.e. its last complete JSON line
+
+    Only the tail of the file is read, growing the block until it holds a whole line.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    block = 8192
+    with open(path, "rb") as f:
+        while True:
+            start = max(0, size - block)
+            f.seek(start)
+            lines = f.read(size - start).split(b"\n")
+            # Unless the block starts the file, its first line may be cut
+            for line in reversed(lines if start == 0 else lines[1:]):
+                if line.strip():
+                    try:
+                        return json.loads(line)
+                    except ValueError:
+                        # A torn line left by a writer that crashed
+                        continue
+            if start == 0:
+                return None
+            block *= 4
+
+
+def build_model_metrics() -> Tuple[dict, List[str]]:
+    """Metrics from the newest stored evaluation run, else model_info.json,
+    else sample values
+
+    Also returns every path the result depends on.
+    """
+    paths = [EVAL_STORE_PATH]
+    try:
+        run = read_latest_run(EVAL_STORE_PATH)
+    except OSError as e:
+        logger.error(f"Error reading evaluation runs: {str(e)}")
+        run = None
+    if run and run.get("metrics"):
+        return {
+            **{name: run["metrics"][name] for name in SAMPLE_METRICS if name in run["metrics"]},
+            "timestamp": run.get("created_at"),
+            "run_id": run.get("run_id"),
+            "model_hash": run.get("model_hash"),
+            "num_examples": run.get("num_examples"),
+        }, paths
+
+    info_path = model_info_path()
+    paths.append(info_path)
+    if os.path.exists(info_path):
+        try:
+            with open(info_path, "r") as f:
+                model_info = json.load(f)
+            return {
+                "accuracy": model_info.get("accuracy", SAMPLE_METRICS["accuracy"]),
+                "f1": model_info.get("f1_score", SAMPLE_METRICS["f1"]),
+                "precision": model_info.get("precision", SAMPLE_METRICS["precision"]),
+                "recall": model_info.get("recall", SAMPLE_METRICS["recall"]),
+                "timestamp": datetime.now().isoformat(),
+            }, paths
+        except Exception as e:
+            logger.error(f"Error loading model_info.json: {str(e)}")
+
+    logger.warning("No metrics file found, returning sample metrics")
+    return {**SAMPLE_METRICS, "timestamp": datetime.now().isoformat()}, paths
+
+
+def file_signature(paths: List[str]) -> tuple:
+    """(path, mtime, size) per path, None for missing ones"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None))
+    return tuple(signature)
+
+
+class WatchedDocument:
+    """A JSON document built from files on disk, rebuilt only when those files change
+
+    The serialized body and its ETag are computed once per build. Between
+    rebuilds the files are only stat()ed, at most every check_interval seconds.
+    """
+
+    def __init__(self, name: str, build: Build, check_interval: float = METADATA_CHECK_INTERVAL):
+        self.name = name
+        self.build = build
+        self.check_interval = check_interval
+        self.body = None
+        self.etag = None
+        self.builds = 0
+        self._paths = []
+        self._signature = None
+        self._checked = 0.0
+
+    def get(self) -> Tuple[str, str]:
+        """(JSON body, ETag), rebuilt first if a watched file changed"""
+        now = time.monotonic()
+        if self.body is not None and now - self._checked < self.check_interval:
+            return self.body, self.etag
+        self._checked = now
+        if self.body is None or file_signature(self._paths) != self._signature:
+            self._rebuild()
+        return self.body, self.etag
+
+    def _rebuild(self):
+        started_ns = time.time_ns()
+        document, paths = self.build()
+        self._paths = paths
+        self._signature = file_signature(paths)
+        # A file written while it was being read may hold newer contents than
+        # this build saw; leave the signature unset so the next check rebuilds
+        if any(entry[1] is not None and entry[1] >= started_ns for entry in self._signature):
+            self._signature = None
+        self.body = json.dumps(document)
+        self.etag = f'W/"{hashlib.sha1(self.body.encode()).hexdigest()}"'
+        self.builds += 1
+        logger.info(f"Loaded {self.name} ({len(paths)} watched paths)")
+
+
+class MetadataRegistry:
+    """In-memory /model-metrics and /model-info documents"""
+
+    def __init__(self):
+        self.metrics = WatchedDocument("model metrics", build_model_metrics)
+        self._model_info: Optional[WatchedDocument] = None
+
+    def model_info(self, analyzer) -> WatchedDocument:
+        if self._model_info is None:
+            self._model_info = WatchedDocument(
+                "model info", lambda: (analyzer.get_model_info(), [model_info_path()])
+            )
+        return self._model_info
@@ -1,15 +1,26 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, String, Float, DateTime, Text
 from sqlalchemy.sql import func
 from database import Base
 
 class SentimentAnalysis(Base):
     __tablename__ = "sentiment_analyses"
+    # On Postgres the table is range-partitioned by month on created_at
+    # (see migrations/versions/0002), so its real primary key is
+    # (id, created_at); id alone is still unique and identifies a row here
+    __table_args__ = (
+        Index("ix_sentiment_analyses_user_id_created_at", "user_id", "created_at"),
+        Index("ix_sentiment_analyses_sentiment_created_at", "sentiment", "created_at"),
+        Index("ix_sentiment_analyses_text_hash", "text_hash"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     text = Column(Text, nullable=False)
+    # sha256 hex of text, for finding repeated reviews without scanning text
+    text_hash = Column(String(64), nullable=True)
     sentiment = Column(String(10), nullable=False)
     confidence = Column(Float, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 class User(Base):
     __tablename__ = "users"
@@ -17,4 +28,25 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SentimentRollup(Base):
+    """Per-user hourly and daily sentiment counts, maintained by rollups.py"""
+    __tablename__ = "sentiment_rollups"
+
+    # 0 stands for unauthenticated /analyze-public requests
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    granularity = Column(String(4), primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    # Confidence histogram, one count per 0.1 band from 0.5 up; the top
+    # class of a two-class softmax never scores below 0.5
+    confidence_50 = Column(Integer, nullable=False, default=0)
+    confidence_60 = Column(Integer, nullable=False, default=0)
+    confidence_70 = Column(Integer, nullable=False, default=0)
+    confidence_80 = Column(Integer, nullable=False, default=0)
+    confidence_90 = Column(Integer, nullable=False, default=0)
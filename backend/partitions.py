@@ -0,0 +1,106 @@
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import List
+
+from sqlalchemy import text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions of sentiment_analyses created ahead of the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Months of history kept; older partitions are dropped (0 keeps everything)
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+# Seconds between maintenance runs
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "21600"))
+
+TABLE = "sentiment_analyses"
+# Any fixed key works; it only has to be the same for every worker
+ADVISORY_LOCK_KEY = 0x5E471
+
+
+def add_months(month: date, n: int) -> date:
+    years, month_index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Matches the names used by migration 0002"""
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def current_month() -> date:
+    now = datetime.now(timezone.utc)
+    return date(now.year, now.month, 1)
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('p', 'r')"),
+        {"name": TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(connection) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :name ORDER BY child.relname"
+    ), {"name": TABLE}).scalars())
+
+
+def ensure_partitions(connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create the partitions for this month and the next months_ahead"""
+    existing = set(list_partitions(connection))
+    created = []
+    month = current_month()
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        if name not in existing:
+            # Fails if the default partition already holds rows for this month;
+            # keeping months_ahead > 0 means that never happens in practice
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{add_months(month, 1)} 00:00:00+00')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_expired_partitions(connection, retention_months: int = PARTITION_RETENTION_MONTHS) -> List[str]:
+    """Drop monthly partitions that end before the retention cutoff"""
+    if retention_months <= 0:
+        return []
+    cutoff = partition_name(add_months(current_month(), -retention_months))
+    dropped = []
+    for name in list_partitions(connection):
+        # Monthly names sort chronologically; the default partition is never dropped
+        if name.startswith(f"{TABLE}_p") and name < cutoff:
+            connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions() -> dict:
+    """Create upcoming partitions and apply retention; a no-op unless the table is partitioned"""
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return {"partitioned": False}
+        # Serialize workers; the lock is released when the transaction ends
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        created = ensure_partitions(connection)
+        dropped = drop_expired_partitions(connection)
+    for name in created:
+        logger.info(f"Created partition {name}")
+    for name in dropped:
+        logger.info(f"Dropped expired partition {name}")
+    return {"partitioned": True, "created": created, "dropped": dropped}
+
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# bcrypt runs on its own threads so login bursts cannot starve inference
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hash/verify calls allowed to wait for a worker before new ones get a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# Failed logins per account within LOGIN_FAILURE_WINDOW seconds before a 429
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+# Accounts with recent failures kept in memory; past this the stalest are forgotten
+LOGIN_TRACKED_ACCOUNTS = int(os.getenv("LOGIN_TRACKED_ACCOUNTS", "100000"))
+
+# Number of recent hash timings kept for stats
+STATS_WINDOW = 1024
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting"""
+
+
+class TooManyAttempts(Exception):
+    """Raised when an account has too many recent failed logins"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many failed login attempts, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs passlib hashing and verification on a small bounded thread pool"""
+
+    def __init__(
+        self,
+        context: CryptContext,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.context = context
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._rejected = 0
+        self._timings = deque(maxlen=STATS_WINDOW)
+        self._count = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def _run(self, fn, *args):
+        # Only called from the event loop thread, so no lock is needed
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise PasswordHasherBusy(f"Password hashing queue is full ({self._pending} pending)")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._timings.append(time.perf_counter() - started)
+            self._count += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        timings = sorted(self._timings)
+
+        def percentile(p):
+            if not timings:
+                return 0.0
+            return timings[min(len(timings) - 1, int(p * len(timings)))] * 1000
+
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self._rejected,
+            "operations": self._count,
+            "hash_ms_avg": sum(timings) / len(timings) * 1000 if timings else 0.0,
+            "hash_ms_p50": percentile(0.50),
+            "hash_ms_p95": percentile(0.95),
+            "hash_ms_max": timings[-1] * 1000 if timings else 0.0,
+        }
+
+
+class LoginRateLimiter:
+    """Sliding window of failed logins per account
+
+    Attempts still waiting on bcrypt count against the budget too, so
+    guesses fired in parallel cannot all slip past the check before the
+    first failure is recorded.
+    """
+
+    def __init__(
+        self,
+        max_failures: int = LOGIN_MAX_FAILURES,
+        window: float = LOGIN_FAILURE_WINDOW,
+        max_accounts: int = LOGIN_TRACKED_ACCOUNTS,
+    ):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_accounts = max(1, max_accounts)
+        # Least recently failed account first, so the cap evicts the stalest
+        self._failures = OrderedDict()
+        self._in_flight = defaultdict(int)
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+        self.blocked = 0
+        self.evicted = 0
+
+    @contextmanager
+    def attempt(self, account: str):
+        """Reserve one attempt for the account while the block runs
+
+        Raises TooManyAttempts if recent failures plus attempts in progress
+        already use up the account's budget.
+        """
+        if self.max_failures <= 0:
+            yield
+            return
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(account)
+            if failures is not None:
+                self._expire(account, failures, now)
+            used = len(self._failures.get(account, ())) + self._in_flight[account]
+            if used >= self.max_failures:
+                if not self._in_flight[account]:
+                    del self._in_flight[account]
+                self.blocked += 1
+                # With only attempts in progress, retry once they have finished
+                retry_after = failures[0] + self.window - now if failures else 1.0
+                raise TooManyAttempts(retry_after)
+            self._in_flight[account] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[account] -= 1
+                if not self._in_flight[account]:
+                    del self._in_flight[account]
+
+    def record_failure(self, account: str):
+        if self.max_failures <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.pop(account, None) or deque()
+            failures.append(now)
+            self._failures[account] = failures
+            if now - self._swept >= self.window:
+                self._sweep(now)
+            while len(self._failures) > self.max_accounts:
+                self._failures.popitem(last=False)
+                self.evicted += 1
+
+    def reset(self, account: str):
+        with self._lock:
+            self._failures.pop(account, None)
+
+    def _expire(self, account: str, failures: deque, now: float):
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[account]
+
+    def _sweep(self, now: float):
+        """Forget every account whose failures have all left the window"""
+        self._swept = now
+        for account, failures in list(self._failures.items()):
+            self._expire(account, failures, now)
+
+    def stats(self) -> dict:
+        return {
+            "max_failures": self.max_failures,
+            "window_seconds": self.window,
+            "tracked_accounts": len(self._failures),
+            "max_tracked_accounts": self.max_accounts,
+            "attempts_in_progress": sum(self._in_flight.values()),
+            "blocked_attempts": self.blocked,
+            "evicted_accounts": self.evicted,
+        }
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Runs a blocking maintenance function at startup and then every interval seconds"""
+
+    def __init__(self, name: str, fn: Callable[[], object], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.last_run = None
+        self.last_error = None
+        self._task = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.fn)
+                self.last_run = datetime.now(timezone.utc)
+                self.last_error = None
+            except Exception as e:
+                # The database may still be starting; try again next interval
+                self.last_error = str(e)
+                logger.error(f"{self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_error": self.last_error,
+        }
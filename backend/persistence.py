@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List
+
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import database
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# How analysis rows reach the database:
+#   "sync"    - each request writes its own rows before responding
+#   "batched" - rows are grouped with other requests' rows, and each request
+#               responds once the batch holding its rows is committed
+#   "async"   - rows are buffered and the request responds immediately
+#               (rows still queued are lost if the process is killed)
+PERSIST_MODE = os.getenv("PERSIST_MODE", "batched")
+PERSIST_MODES = ("sync", "batched", "async")
+# A buffered batch is flushed at this many rows or after this long
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "500"))
+PERSIST_FLUSH_INTERVAL_MS = float(os.getenv("PERSIST_FLUSH_INTERVAL_MS", "100"))
+# Rows allowed in the buffer before new requests wait for room
+PERSIST_MAX_QUEUE = int(os.getenv("PERSIST_MAX_QUEUE", "20000"))
+# Attempts per flush before its rows are given up on
+PERSIST_RETRIES = int(os.getenv("PERSIST_RETRIES", "3"))
+
+# Number of recent flush timings kept for stats
+STATS_WINDOW = 1024
+
+_STOP = object()
+
+
+def text_hash(text: str) -> str:
+    """sha256 hex digest stored alongside each analysis"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def save_analyses(rows: List[dict]):
+    """Insert analysis rows in a single multi-row INSERT"""
+    if database.AsyncSessionLocal is not None:
+        async with database.AsyncSessionLocal() as db:
+            await crud.add_analyses(db, rows)
+        return
+    db = database.SessionLocal()
+    try:
+        await crud.add_analyses(db, rows)
+    finally:
+        # Closing also rolls back a failed insert
+        await run_in_threadpool(db.close)
+
+
+class AnalysisWriter:
+    """Write-behind buffer that persists SentimentAnalysis rows in bulk"""
+
+    def __init__(
+        self,
+        mode: str = PERSIST_MODE,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        flush_interval_ms: float = PERSIST_FLUSH_INTERVAL_MS,
+        max_queue: int = PERSIST_MAX_QUEUE,
+    ):
+        if mode not in PERSIST_MODES:
+            logger.warning(f"Unknown PERSIST_MODE {mode!r}, using batched")
+            mode = "batched"
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self._queue = None
+        self._task = None
+
+        # Stats
+        self._flushes = 0
+        self._rows_written = 0
+        self._rows_failed = 0
+        self._flush_times = deque(maxlen=STATS_WINDOW)
+        self._last_error = None
+
+    async def start(self):
+        if self.mode != "sync" and self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Analysis writer started (mode={self.mode}, batch_size={self.batch_size}, "
+                f"flush_interval_ms={self.flush_interval * 1000:g})"
+            )
+
+    async def stop(self):
+        """Flush everything still buffered, then stop"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info("Analysis writer flushed and stopped")
+
+    async def record(self, row: dict):
+        await self.record_many([row])
+
+    async def record_many(self, rows: List[dict]):
+        """Persist rows according to the configured mode"""
+        if not rows:
+            return
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            if "text_hash" not in row:
+                row["text_hash"] = text_hash(row["text"])
+            # Stamped here rather than by the database so rollups can bucket the row
+            row.setdefault("created_at", now)
+            # Every row of a multi-row INSERT needs the same keys
+            row.setdefault("user_id", None)
+        # Time the caller waits for its rows, however the mode handles them
+        with metrics.stage("persist"):
+            if self._task is None:
+                # sync mode, or the writer is not running
+                await self._write(rows)
+                return
+
+            loop = asyncio.get_running_loop()
+            futures = []
+            for row in rows:
+                future = loop.create_future() if self.mode == "batched" else None
+                await self._queue.put((row, future))
+                futures.append(future)
+            if self.mode == "batched":
+                await asyncio.gather(*futures)
+
+    async def _collect(self):
+        """Wait for a row, then gather more until the batch is full or the interval passes"""
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        while True:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                # Anything queued behind the stop marker still gets written
+                rest = []
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        rest.append(item)
+                for start in range(0, len(rest), self.batch_size):
+                    await self._flush(rest[start:start + self.batch_size])
+                return
+
+    async def _flush(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            await self._write(rows)
+        except Exception as e:
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def _write(self, rows: List[dict]):
+        """Insert rows, retrying with backoff; raises once every attempt failed"""
+        for attempt in range(max(1, PERSIST_RETRIES)):
+            started = time.perf_counter()
+            try:
+                await save_analyses(rows)
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error(f"Failed to persist {len(rows)} analyses (attempt {attempt + 1}): {str(e)}")
+                if attempt + 1 < max(1, PERSIST_RETRIES):
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                self._rows_failed += len(rows)
+                raise
+            elapsed = time.perf_counter() - started
+            self._flush_times.append(elapsed)
+            metrics.observe_stage("db_write", elapsed)
+            metrics.DB_WRITE_ROWS.observe(len(rows))
+            self._flushes += 1
+            self._rows_written += len(rows)
+            return
+
+    def stats(self) -> dict:
+        timings = sorted(self._flush_times)
+
+        def percentile(p):
+            if not timings:
+                return 0.0
+            return timings[min(len(timings) - 1, int(p * len(timings)))] * 1000
+
+        return {
+            "mode": self.mode,
+            "queue_length": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flushes": self._flushes,
+            "rows_written": self._rows_written,
+            "rows_failed": self._rows_failed,
+            "avg_rows_per_flush": self._rows_written / self._flushes if self._flushes else 0.0,
+            "flush_ms_p50": percentile(0.50),
+            "flush_ms_p95": percentile(0.95),
+            "flush_ms_max": timings[-1] * 1000 if timings else 0.0,
+            "last_error": self._last_error,
+        }
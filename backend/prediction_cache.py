@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# In-process LRU entries per worker (0 disables the cache)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+# Seconds a cached prediction stays valid (0 means no expiry)
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+# Optional SQLite file shared by all workers on the host
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH")
+
+# Cache writes/reads never wait long for another worker's lock
+SQLITE_TIMEOUT = 0.05
+
+
+def normalize_text(text: str) -> str:
+    """Fold texts that the uncased tokenizer sees identically onto one form"""
+    return " ".join(unicodedata.normalize("NFKC", text).split()).lower()
+
+
+class PredictionCache:
+    """LRU/TTL cache of predictions keyed on normalized text and model version
+
+    Entries live in an in-process tier and, when a path is given, in a SQLite
+    tier shared across uvicorn workers. Keys include the model version, so a
+    new version misses every older entry; rows on disk are left for workers
+    still serving the old model and only purged once expired.
+
+    Every SQLite call runs on the tier's own thread: lookup() awaits its
+    reads, put() queues writes that thread commits in batches, and the
+    blocking get() waits on it, so the file is never opened on the event loop.
+    """
+
+    def __init__(
+        self,
+        model_version: str,
+        max_size: int = PREDICTION_CACHE_SIZE,
+        ttl: float = PREDICTION_CACHE_TTL,
+        path: Optional[str] = PREDICTION_CACHE_PATH,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path if max_size > 0 else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_executor = None
+        self._pending_writes = []
+        self._flush_scheduled = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.model_version = None
+        if self.path:
+            self._init_disk()
+        self.set_model_version(model_version)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_version}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def set_model_version(self, model_version: str):
+        """Switch to a new model; entries from any other one are no longer served"""
+        if model_version == self.model_version:
+            return
+        with self._lock:
+            self._entries.clear()
+            self._pending_writes = []
+        self.model_version = model_version
+        if self.path:
+            self._disk_executor.submit(self._disk_purge_expired)
+
+    def get(self, text: str) -> Optional[Tuple[str, float]]:
+        """Blocking lookup in both tiers; use lookup() from the event loop"""
+        if not self.enabled:
+            return None
+        key = self.key(text)
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        value = self._disk_executor.submit(self._disk_get, key, now).result() if self.path else None
+        return self._record_disk_result(key, value, now)
+
+    async def lookup(self, text: str) -> Optional[Tuple[str, float]]:
+        return (await self.lookup_many([text]))[0]
+
+    async def lookup_many(self, texts: List[str]) -> List[Optional[Tuple[str, float]]]:
+        """Cached predictions for texts (None for misses), reading SQLite off the event loop"""
+        if not self.enabled:
+            return [None] * len(texts)
+        now = time.time()
+        keys = [self.key(text) for text in texts]
+        results = [self._memory_get(key, now) for key in keys]
+        missing = [i for i, value in enumerate(results) if value is None]
+        if missing and self.path:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(
+                self._disk_executor, self._disk_get_many, [keys[i] for i in missing], now
+            )
+        else:
+            found = [None] * len(missing)
+        for i, value in zip(missing, found):
+            results[i] = self._record_disk_result(keys[i], value, now)
+        return results
+
+    def put(self, text: str, value: Tuple[str, float]):
+        """Store in memory now; the SQLite write is queued for the cache's thread"""
+        if not self.enabled:
+            return
+        key = self.key(text)
+        now = time.time()
+        self._remember(key, value, now)
+        if not self.path:
+            return
+        expires_at = now + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            # A slow disk drops writes rather than growing the queue without bound
+            if len(self._pending_writes) < self.max_size:
+                self._pending_writes.append((key, self.model_version, value[0], value[1], expires_at))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._disk_executor.submit(self._disk_flush)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is None or expires_at > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+            return None
+
+    def _record_disk_result(self, key, value, now):
+        if value is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, value, now)
+        return value
+
+    def _remember(self, key, value, now):
+        expires_at = now + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _init_disk(self):
+        self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction_cache")
+        try:
+            self._disk_executor.submit(self._disk_create).result()
+            logger.info(f"Prediction cache disk tier at {self.path}")
+        except sqlite3.Error as e:
+            logger.warning(f"Disabling prediction cache disk tier: {str(e)}")
+            self._disk_executor.shutdown(wait=False)
+            self._disk_executor = None
+            self.path = None
+
+    def _disk_create(self):
+        db = self._disk()
+        db.execute("PRAGMA journal_mode=WAL")
+        # Losing the last writes in a power cut only costs cache misses
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, model_version TEXT NOT NULL, "
+            "sentiment TEXT NOT NULL, confidence REAL NOT NULL, expires_at REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS predictions_expires_at ON predictions (expires_at)")
+        db.commit()
+
+    def _disk_purge_expired(self):
+        try:
+            db = self._disk()
+            db.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not purge expired predictions from cache: {str(e)}")
+
+    def _disk(self) -> sqlite3.Connection:
+        # Only called on the tier's single thread, which owns the connection
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+        return self._db
+
+    def _disk_get(self, key, now):
+        try:
+            row = self._disk().execute(
+                "SELECT sentiment, confidence, expires_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Prediction cache read failed: %s", e)
+            return None
+        if row is None or (row[2] is not None and row[2] <= now):
+            return None
+        return row[0], row[1]
+
+    def _disk_get_many(self, keys, now):
+        return [self._disk_get(key, now) for key in keys]
+
+    def _disk_flush(self):
+        """Write every queued prediction in one transaction (runs on the cache's thread)"""
+        with self._lock:
+            rows, self._pending_writes = self._pending_writes, []
+            self._flush_scheduled = False
+        if not rows:
+            return
+        try:
+            db = self._disk()
+            db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+            db.commit()
+        except sqlite3.Error as e:
+            # Another worker holds the lock; a missed cache write is harmless
+            logger.debug("Prediction cache write failed: %s", e)
+
+    def flush(self):
+        """Wait until queued SQLite writes are committed"""
+        if self._disk_executor is not None:
+            self._disk_executor.submit(self._disk_flush).result()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_version": self.model_version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "disk_tier": self.path,
+            "disk_pending_writes": len(self._pending_writes),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Off by default: the profile endpoint answers 404 and the model forward skips
+# every profiling hook but one attribute check
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Comma-separated emails of the users allowed to capture profiles and read the
+# /*-stats endpoints
+PROFILING_ADMINS = {email.strip().lower() for email in os.getenv("PROFILING_ADMINS", "").split(",") if email.strip()}
+# Longest capture one request may ask for, in seconds
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+# Python stack samples per second
+PROFILE_SAMPLE_HZ = int(os.getenv("PROFILE_SAMPLE_HZ", "100"))
+PROFILE_MAX_HZ = 1000
+
+MEDIA_TYPE = "text/plain"
+
+# Set while a capture wants torch operator timings from the model forward
+_torch_session: Optional["TorchOpSession"] = None
+_NO_PROFILE = contextlib.nullcontext()
+_capture_lock = asyncio.Lock()
+
+
+def is_admin(email: str) -> bool:
+    return email.lower() in PROFILING_ADMINS
+
+
+class ProfileInProgress(Exception):
+    """Raised when a capture is requested while another one is running"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the collapsed format, so it cannot appear in one
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+class StackSampler:
+    """Samples every thread's Python stack from a background thread
+
+    Stacks are kept collapsed (root first, frames joined by ';') with a
+    count per distinct stack, which is what flamegraph tools read.
+    """
+
+    def __init__(self, hz: int):
+        self.interval = 1.0 / hz
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+            # Keep the rate steady however long a sample took
+            next_sample += self.interval
+            self._stop.wait(max(0.0, next_sample - time.perf_counter()))
+
+
+class TorchOpSession:
+    """torch.profiler around each model forward while a capture runs
+
+    Operator self times are summed per operator call path. Forwards running
+    on other inference threads at the same moment are not profiled, since
+    only one torch profiler can be active at a time.
+    """
+
+    def __init__(self):
+        self.stacks: Dict[str, float] = Counter()
+        self.forwards = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def profile_forward(self):
+        if not self._lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            from torch.profiler import ProfilerActivity, profile
+
+            with profile(activities=[ProfilerActivity.CPU]) as prof:
+                yield
+            for event in prof.events():
+                names = []
+                parent = event
+                while parent is not None:
+                    names.append(parent.name.replace(";", ":"))
+                    parent = parent.cpu_parent
+                self.stacks[";".join(["forward"] + names[::-1])] += event.self_cpu_time_total
+            self.forwards += 1
+        finally:
+            self._lock.release()
+
+
+def record_forward():
+    """Context for one model forward: a torch profiler while a capture asks for one, else nothing"""
+    session = _torch_session
+    if session is None:
+        return _NO_PROFILE
+    return session.profile_forward()
+
+
+def collapsed(sampler: StackSampler, torch_ops: Optional[TorchOpSession]) -> str:
+    """Both profiles as one collapsed-stack file weighted in microseconds
+
+    Python samples sit under a "python" root and operator times under a
+    "torch" root; the two are separate views of the same time, so compare
+    frames within a root rather than the roots themselves.
+    """
+    sample_us = sampler.interval * 1_000_000
+    lines = [f"python;{stack} {round(count * sample_us)}" for stack, count in sampler.stacks.most_common()]
+    if torch_ops is not None:
+        lines += [f"torch;{stack} {round(us)}" for stack, us in torch_ops.stacks.items() if round(us) > 0]
+    return "\n".join(lines) + "\n"
+
+
+async def capture(seconds: float, hz: int = PROFILE_SAMPLE_HZ, torch_ops: bool = True) -> str:
+    """Profile this worker for the given time and return collapsed stacks
+
+    One capture runs at a time per worker; the request handling the capture
+    only sleeps, so it does not show up in its own profile.
+    """
+    global _torch_session
+    if _capture_lock.locked():
+        raise ProfileInProgress("A profile is already being captured on this worker")
+    async with _capture_lock:
+        sampler = StackSampler(min(max(hz, 1), PROFILE_MAX_HZ))
+        session = TorchOpSession() if torch_ops else None
+        logger.info(f"Profiling worker {os.getpid()} for {seconds}s at {hz}Hz (torch ops: {torch_ops})")
+        _torch_session = session
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+            _torch_session = None
+        forwards = session.forwards if session is not None else 0
+        logger.info(f"Profile captured: {sampler.samples} samples, {forwards} profiled forwards")
+        return collapsed(sampler, session)
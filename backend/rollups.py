@@ -0,0 +1,241 @@
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Hours of recent rollups recomputed from sentiment_analyses by the periodic job
+ROLLUP_REBUILD_HOURS = int(os.getenv("ROLLUP_REBUILD_HOURS", "48"))
+# Seconds between rebuilds (0 disables; rollups are still updated on insert)
+ROLLUP_REBUILD_INTERVAL = float(os.getenv("ROLLUP_REBUILD_INTERVAL", "3600"))
+
+# Buckets that ended less than this many seconds ago are left to the insert-time updates,
+# since analyses stamped inside them may still be waiting in a writer
+REBUILD_SETTLE_SECONDS = 300
+# Any fixed key works; it only has to be the same for every worker
+REBUILD_LOCK_KEY = 0x5E472
+
+# Most buckets one /trends call returns
+TRENDS_MAX_BUCKETS = int(os.getenv("TRENDS_MAX_BUCKETS", "2000"))
+# Range shown by /trends when the client gives no `since`
+TRENDS_DEFAULT_WINDOW = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+GRANULARITIES = ("hour", "day")
+ANONYMOUS_USER_ID = 0
+SENTIMENT_COLUMNS = ("positive", "negative", "neutral")
+HISTOGRAM_COLUMNS = ("confidence_50", "confidence_60", "confidence_70", "confidence_80", "confidence_90")
+COUNTER_COLUMNS = ("total", *SENTIMENT_COLUMNS, "confidence_sum", *HISTOGRAM_COLUMNS)
+
+BucketKey = Tuple[int, str, datetime]
+
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour or day holding created_at (naive times are taken as UTC)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    start = created_at.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        start = start.replace(hour=0)
+    return start
+
+
+def histogram_column(confidence: float) -> str:
+    band = min(max(int(confidence * 10), 5), 9)
+    return HISTOGRAM_COLUMNS[band - 5]
+
+
+def accumulate(buckets: Dict[BucketKey, dict], rows: Iterable[dict]):
+    """Add analysis rows (user_id, sentiment, confidence, created_at) to hour and day buckets"""
+    for row in rows:
+        user_id = row.get("user_id")
+        if user_id is None:
+            user_id = ANONYMOUS_USER_ID
+        for granularity in GRANULARITIES:
+            key = (user_id, granularity, bucket_start(row["created_at"], granularity))
+            counts = buckets.get(key)
+            if counts is None:
+                counts = buckets[key] = dict.fromkeys(COUNTER_COLUMNS, 0)
+            counts["total"] += 1
+            if row["sentiment"] in SENTIMENT_COLUMNS:
+                counts[row["sentiment"]] += 1
+            counts["confidence_sum"] += row["confidence"]
+            counts[histogram_column(row["confidence"])] += 1
+
+
+def upsert_rollups(db: Session, buckets: Dict[BucketKey, dict]):
+    """Add bucket counts onto sentiment_rollups in one INSERT ... ON CONFLICT"""
+    if not buckets:
+        return
+    # A fixed key order keeps concurrent writers from deadlocking on row locks
+    values = [
+        {"user_id": user_id, "granularity": granularity, "bucket_start": start, **counts}
+        for (user_id, granularity, start), counts in sorted(buckets.items())
+    ]
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    rollup = models.SentimentRollup
+    statement = dialect.insert(rollup).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[rollup.user_id, rollup.granularity, rollup.bucket_start],
+        set_={column: getattr(rollup, column) + getattr(statement.excluded, column) for column in COUNTER_COLUMNS},
+    )
+    db.execute(statement)
+
+
+def apply_rows(db: Session, rows: List[dict]):
+    """Fold newly inserted analyses into the rollups, in the caller's transaction"""
+    buckets = {}
+    accumulate(buckets, rows)
+    upsert_rollups(db, buckets)
+
+
+def lock_rollups(db: Session):
+    """Hold off writers' rollup updates until the transaction ends (Postgres only)"""
+    db.execute(text("LOCK TABLE sentiment_rollups IN SHARE ROW EXCLUSIVE MODE"))
+
+
+def rebuild_rollups(
+    db: Session,
+    since: datetime,
+    until: Optional[datetime] = None,
+    settle_seconds: Optional[float] = REBUILD_SETTLE_SECONDS,
+) -> Optional[int]:
+    """Recompute rollups from `since` (rounded down to a day) from sentiment_analyses
+
+    Repairs drift from rows written outside the analysis writer or removed
+    by retention, and backfills rollups for existing data.
+
+    With settle_seconds, only buckets that ended at least that long ago are
+    replaced, so no analysis can still be on its way into them; writers are
+    then held off only while the old buckets are swapped for the new ones.
+    With None, every bucket up to `until` is replaced and writers wait for
+    the whole rebuild, as a full backfill needs.
+
+    Returns the number of analyses read, or None if another worker is
+    already rebuilding.
+    """
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        # One rebuild at a time across workers; released when the transaction ends
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REBUILD_LOCK_KEY}).scalar():
+            db.rollback()
+            return None
+
+    since = bucket_start(since, "day")
+    hour_cutoff = day_cutoff = bucket_start(until, "day") if until is not None else None
+    if settle_seconds is not None:
+        settled = bucket_start(datetime.now(timezone.utc) - timedelta(seconds=settle_seconds), "hour")
+        hour_cutoff = min(hour_cutoff, settled) if hour_cutoff is not None else settled
+        settled_day = bucket_start(settled, "day")
+        day_cutoff = min(day_cutoff, settled_day) if day_cutoff is not None else settled_day
+    elif postgres:
+        lock_rollups(db)
+
+    analysis = models.SentimentAnalysis
+    rollup = models.SentimentRollup
+    query = select(analysis.user_id, analysis.sentiment, analysis.confidence, analysis.created_at).where(
+        analysis.created_at >= since
+    )
+    if hour_cutoff is not None:
+        query = query.where(analysis.created_at < hour_cutoff)
+
+    buckets = {}
+    rows = 0
+    for row in db.execute(query.execution_options(yield_per=5000)).mappings():
+        accumulate(buckets, [row])
+        rows += 1
+    if day_cutoff is not None:
+        # Days that run past the hour cutoff were only partly read
+        buckets = {key: counts for key, counts in buckets.items() if key[1] == "hour" or key[2] < day_cutoff}
+
+    if settle_seconds is not None and postgres:
+        lock_rollups(db)
+    for granularity, cutoff in (("hour", hour_cutoff), ("day", day_cutoff)):
+        cleanup = delete(rollup).where(rollup.granularity == granularity, rollup.bucket_start >= since)
+        if cutoff is not None:
+            cleanup = cleanup.where(rollup.bucket_start < cutoff)
+        db.execute(cleanup)
+    upsert_rollups(db, buckets)
+    db.commit()
+    return rows
+
+
+def rebuild_recent_rollups():
+    """Periodic job: rebuild the last ROLLUP_REBUILD_HOURS of rollups"""
+    if ROLLUP_REBUILD_HOURS <= 0:
+        return
+    since = datetime.now(timezone.utc) - timedelta(hours=ROLLUP_REBUILD_HOURS)
+    db = SessionLocal()
+    try:
+        rows = rebuild_rollups(db, since)
+    finally:
+        db.close()
+    if rows is None:
+        logger.info("Skipped rollup rebuild, another worker is running it")
+        return
+    logger.info(f"Rebuilt sentiment rollups from {rows} analyses since {since:%Y-%m-%d %H:%M}")
+
+
+def list_rollups(
+    db: Session,
+    user_id: int,
+    granularity: str,
+    since: datetime,
+    until: datetime,
+    limit: int,
+) -> List[models.SentimentRollup]:
+    rollup = models.SentimentRollup
+    query = (
+        select(rollup)
+        .where(rollup.user_id == user_id, rollup.granularity == granularity)
+        .where(rollup.bucket_start >= bucket_start(since, granularity), rollup.bucket_start < until)
+        .order_by(rollup.bucket_start)
+        .limit(limit)
+    )
+    return list(db.execute(query).scalars())
+
+
+def trend_bucket(rollup: models.SentimentRollup) -> schemas.TrendBucket:
+    return schemas.TrendBucket(
+        bucket_start=rollup.bucket_start,
+        total=rollup.total,
+        positive=rollup.positive,
+        negative=rollup.negative,
+        neutral=rollup.neutral,
+        positive_ratio=rollup.positive / rollup.total if rollup.total else 0.0,
+        avg_confidence=rollup.confidence_sum / rollup.total if rollup.total else 0.0,
+        confidence_histogram=[getattr(rollup, column) for column in HISTOGRAM_COLUMNS],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or repair sentiment_rollups from sentiment_analyses")
+    parser.add_argument("--days", type=int, default=None, help="rebuild only the last N days (default: everything)")
+    args = parser.parse_args()
+
+    since = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    if args.days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    db = SessionLocal()
+    try:
+        # Everything up to now, with writers held off for the whole rebuild
+        rows = rebuild_rollups(db, since, settle_seconds=None)
+    finally:
+        db.close()
+    if rows is None:
+        print("Another process is rebuilding the rollups; try again when it finishes")
+        return
+    print(f"Rebuilt rollups from {rows} analyses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from fastapi import HTTPException, status
+
+from batching import MicroBatcher
+from inference_pool import InferencePool
+from model_metadata import MetadataRegistry
+from partitions import PARTITION_MAINTENANCE_INTERVAL, maintain_partitions
+from periodic import PeriodicJob
+from rollups import ROLLUP_REBUILD_INTERVAL, rebuild_recent_rollups
+from persistence import AnalysisWriter
+from prediction_cache import PredictionCache
+from sentiment_model import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# "eager" connects the database and loads the model before the server binds;
+# "lazy" binds immediately and does both in the background, see /ready
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+# Texts pushed through the model before it is marked ready (0 skips warm-up)
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "8"))
+# Lazy mode retries the database connection, doubling the wait from
+# STARTUP_RETRY_SECONDS up to STARTUP_RETRY_MAX_SECONDS between attempts
+STARTUP_RETRY_SECONDS = float(os.getenv("STARTUP_RETRY_SECONDS", "1"))
+STARTUP_RETRY_MAX_SECONDS = float(os.getenv("STARTUP_RETRY_MAX_SECONDS", "60"))
+# Connection attempts before lazy startup gives up and /ready reports failed (0 retries forever)
+STARTUP_MAX_ATTEMPTS = int(os.getenv("STARTUP_MAX_ATTEMPTS", "0"))
+
+WARMUP_SENTENCE = "The product arrived on time and works exactly as described, I would buy it again."
+
+
+def warm_up(analyzer: SentimentAnalyzer, batch_size: int):
+    """Run texts of increasing length through the model so the first real request is not cold"""
+    if batch_size <= 0:
+        return
+    # Doubling lengths touch every token-length bucket up to the 512 limit
+    texts = [" ".join([WARMUP_SENTENCE] * (2 ** (i % 6))) for i in range(batch_size)]
+    analyzer.analyze_batch(texts)
+
+
+class ServiceRuntime:
+    """Owns the model serving stack and records how long each startup phase took"""
+
+    def __init__(self, init_database: Callable[[], None]):
+        self.init_database = init_database
+        self.pool = InferencePool()
+        self.writer = AnalysisWriter()
+        self.partitions = PeriodicJob("Partition maintenance", maintain_partitions, PARTITION_MAINTENANCE_INTERVAL)
+        self.rollups = PeriodicJob("Rollup rebuild", rebuild_recent_rollups, ROLLUP_REBUILD_INTERVAL)
+        self.metadata = MetadataRegistry()
+        self.analyzer = None
+        self.cache = None
+        self.batcher = None
+        self.ready = False
+        self.error = None
+        self.phases = {}
+        self.attempts = 0
+        self._created = time.perf_counter()
+        self._task = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 3)
+            logger.info(f"Startup phase '{name}' took {self.phases[name]:.2f}s")
+
+    def connect(self):
+        """Connect the database and create missing tables (blocking)"""
+        with self.phase("database"):
+            self.init_database()
+
+    def load(self):
+        """Load and warm up the model (blocking)"""
+        with self.phase("model_load"):
+            analyzer = SentimentAnalyzer.get_instance()
+        with self.phase("warmup"):
+            warm_up(analyzer, WARMUP_BATCH_SIZE)
+        self.analyzer = analyzer
+        self.cache = PredictionCache(analyzer.model_version)
+        self.batcher = MicroBatcher(analyzer.analyze_batch, self.pool, self.cache)
+
+    async def start(self):
+        logger.info(f"Starting service in {STARTUP_MODE} mode")
+        if STARTUP_MODE == "lazy":
+            self._task = asyncio.create_task(self._load_in_background())
+        else:
+            self.connect()
+            await self._start_jobs()
+            self.load()
+            await self._mark_ready()
+
+    async def _start_jobs(self):
+        """Start the background work that needs the database, once it is reachable"""
+        await self.writer.start()
+        self.partitions.start()
+        self.rollups.start()
+
+    async def _connect_with_retry(self) -> bool:
+        delay = STARTUP_RETRY_SECONDS
+        while True:
+            self.attempts += 1
+            try:
+                await self.pool.run(self.connect)
+                self.error = None
+                return True
+            except Exception as e:
+                self.error = str(e)
+                if STARTUP_MAX_ATTEMPTS and self.attempts >= STARTUP_MAX_ATTEMPTS:
+                    logger.error(f"Database unreachable after {self.attempts} attempts, giving up: {str(e)}")
+                    return False
+                logger.warning(f"Database connection attempt {self.attempts} failed, retrying in {delay:g}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+
+    async def _load_in_background(self):
+        if not await self._connect_with_retry():
+            return
+        await self._start_jobs()
+        try:
+            await self.pool.run(self.load)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Background startup failed: {str(e)}", exc_info=True)
+            return
+        await self._mark_ready()
+
+    async def _mark_ready(self):
+        await self.batcher.start()
+        self.ready = True
+        self.phases["total"] = round(time.perf_counter() - self._created, 3)
+        logger.info(f"Service ready after {self.phases['total']:.2f}s")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        if self.batcher is not None:
+            await self.batcher.stop()
+        # Requests have drained through the batcher, so the buffer is complete
+        await self.writer.stop()
+        await self.partitions.stop()
+        await self.rollups.stop()
+        self.pool.shutdown()
+
+    def require_ready(self):
+        """Dependency for endpoints that need the model"""
+        if not self.ready:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Sentiment model is still loading, please retry shortly",
+                headers={"Retry-After": "5"},
+            )
+
+    def status(self) -> dict:
+        if self.ready:
+            state = "ready"
+        elif self.error is not None and (self._task is None or self._task.done()):
+            # While the database is being retried the last error is reported as "starting"
+            state = "failed"
+        else:
+            state = "starting"
+        return {
+            "status": state,
+            "startup_mode": STARTUP_MODE,
+            "phases_seconds": self.phases,
+            "database_attempts": self.attempts,
+            "error": self.error,
+        }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class SentimentRequest(BaseModel):
     text: str
@@ -13,6 +13,51 @@ class SentimentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BatchSentimentRequest(BaseModel):
+    texts: List[str]
+
+class BatchSentimentResult(BaseModel):
+    index: int
+    sentiment: str
+    confidence: float
+
+class AnalysisRecord(BaseModel):
+    id: int
+    text: str
+    sentiment: str
+    confidence: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class HistoryPage(BaseModel):
+    items: List[AnalysisRecord]
+    # Pass back as ?cursor= for the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+class SearchResult(AnalysisRecord):
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+class TrendBucket(BaseModel):
+    bucket_start: datetime
+    total: int
+    positive: int
+    negative: int
+    neutral: int
+    positive_ratio: float
+    avg_confidence: float
+    # Counts per confidence band: [0.5, 0.6), [0.6, 0.7), ..., [0.9, 1.0]
+    confidence_histogram: List[int]
+
+class TrendsResponse(BaseModel):
+    granularity: str
+    buckets: List[TrendBucket]
+
 class UserBase(BaseModel):
     email: str
 
@@ -1,13 +1,95 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+from transformers.modeling_utils import no_init_weights
 import torch
-from typing import Tuple
+from typing import List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 import numpy as np
 import json
+import hashlib
+import mmap
+import struct
+import time
+
+import metrics
+import profiling
 
 load_dotenv()
 
+# Inference backend: "pytorch" (FP32), "pytorch_int8" (dynamic INT8
+# quantization of the Linear layers) or "onnx" (ONNX Runtime, CPU)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "pytorch")
+MODEL_BACKENDS = ("pytorch", "pytorch_int8", "onnx")
+# Graph inside MODEL_PATH used by the onnx backend, see model/export_model.py
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "model.onnx")
+# torch/ONNX Runtime intra-op threads (0 keeps the library default)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+
+# "mmap" maps model.safetensors copy-on-write and uses the mapped pages as the
+# FP32 weights, so uvicorn workers on one host share a single copy in the page
+# cache instead of each holding a private one
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "default")
+
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin", ONNX_MODEL_FILE)
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+# Longest token sequence fed to the model, special tokens included
+MAX_SEQ_LENGTH = int(os.getenv("MAX_SEQ_LENGTH", "512"))
+# "head" keeps the first tokens of long texts, "head_tail" keeps HEAD_TOKENS
+# from the start and fills the rest of the budget from the end
+TRUNCATION_MODE = os.getenv("TRUNCATION_MODE", "head")
+HEAD_TOKENS = int(os.getenv("HEAD_TOKENS", "128"))
+# Texts are only padded to the longest text within their length bucket
+BUCKET_BOUNDARIES = (16, 32, 64, 128, 256)
+# Upper bound on padded tokens (rows x length) per forward pass
+MAX_BATCH_TOKENS = int(os.getenv("MAX_BATCH_TOKENS", "8192"))
+
+# Returned when inference fails; never cached or treated as a real prediction
+FALLBACK_PREDICTION = ("neutral", 0.5)
+
+def model_fingerprint(model_source: str, settings: str = "") -> str:
+    """Short hash identifying a model directory (config plus weight file size/mtime) or hub name"""
+    digest = hashlib.sha256(f"{model_source}\0{settings}".encode())
+    if os.path.isdir(model_source):
+        config_path = os.path.join(model_source, "config.json")
+        if os.path.exists(config_path):
+            with open(config_path, 'rb') as f:
+                digest.update(f.read())
+        for name in WEIGHT_FILES:
+            weights_path = os.path.join(model_source, name)
+            if os.path.exists(weights_path):
+                stat = os.stat(weights_path)
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+def load_mmap_state_dict(path: str) -> dict:
+    """Return tensors that view a copy-on-write memory map of a safetensors file"""
+    with open(path, 'rb') as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        # ACCESS_COPY keeps the pages shared between processes until written,
+        # which inference never does; the mapping outlives the closed file
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header.pop("__metadata__", None)
+
+    data_start = 8 + header_size
+    state_dict = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        count = (end - begin) // torch.empty(0, dtype=dtype).element_size()
+        if count == 0:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + begin)
+        state_dict[name] = tensor.view(info["shape"])
+    return state_dict
+
 class SentimentAnalyzer:
     def __init__(self):
         # Check if fine-tuned model exists, otherwise use pre-trained model
@@ -18,65 +100,200 @@ class SentimentAnalyzer:
             try:
                 print(f"Loading fine-tuned model from {model_path}")
                 # Use the same model name for both tokenizer and model to ensure compatibility
-                self.tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
-                self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+                self.tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased", use_fast=True)
+                self._load_model(model_path)
                 print("Successfully loaded fine-tuned model")
             except Exception as e:
                 print(f"Error loading fine-tuned model: {e}")
                 print("Falling back to pre-trained model")
                 model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-                self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+                self._load_model(model_name)
         else:
             print("Fine-tuned model not found, using pre-trained model")
             model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            self._load_model(model_name)
         
-        # Move model to GPU if available
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+        # Identifies the loaded weights and input preprocessing, e.g. for keying cached predictions
+        self.model_version = model_fingerprint(
+            self.model_source, f"{self.backend}:{MAX_SEQ_LENGTH}:{TRUNCATION_MODE}:{HEAD_TOKENS}"
+        )
         
-        print(f"Model loaded successfully on {self.device}")
+        print(f"Model loaded successfully on {self.device} ({self.backend} backend)")
+
+    def _load_model(self, model_source: str):
+        """Load the model for MODEL_BACKEND, falling back to FP32 PyTorch"""
+        self.model_source = model_source
+        self.config = AutoConfig.from_pretrained(model_source)
+        self.model = None
+        self.session = None
+        self.weights_mmapped = False
+        self.backend = MODEL_BACKEND
+        if self.backend not in MODEL_BACKENDS:
+            print(f"Unknown MODEL_BACKEND {self.backend!r}, using pytorch")
+            self.backend = "pytorch"
+
+        # Move model to GPU if available; the quantized backends are CPU-only
+        self.device = torch.device("cuda" if torch.cuda.is_available() and self.backend == "pytorch" else "cpu")
+
+        if self.backend == "onnx":
+            onnx_path = os.path.join(model_source, ONNX_MODEL_FILE)
+            try:
+                import onnxruntime
+
+                options = onnxruntime.SessionOptions()
+                if INFERENCE_THREADS > 0:
+                    options.intra_op_num_threads = INFERENCE_THREADS
+                self.session = onnxruntime.InferenceSession(
+                    onnx_path, options, providers=["CPUExecutionProvider"]
+                )
+                return
+            except Exception as e:
+                print(f"Could not load ONNX model from {onnx_path}: {e}")
+                print("Falling back to pytorch backend")
+                self.backend = "pytorch"
+
+        weights_path = os.path.join(model_source, "model.safetensors")
+        if (MODEL_LOAD_MODE == "mmap" and self.backend == "pytorch"
+                and self.device.type == "cpu" and os.path.exists(weights_path)):
+            self.model = self._load_mmap_model(weights_path)
+        if self.model is None:
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_source)
+        if self.backend == "pytorch_int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model.to(self.device)
+        self.model.eval()
+
+    def _load_mmap_model(self, weights_path: str):
+        """Build the model around memory-mapped weights, or return None to load normally"""
+        try:
+            state_dict = load_mmap_state_dict(weights_path)
+            # Skip random initialisation, every weight is about to be replaced
+            with no_init_weights():
+                model = AutoModelForSequenceClassification.from_config(self.config)
+            # assign=True makes the parameters the mapped tensors instead of copying into them
+            missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+            if missing or unexpected:
+                print(f"Memory-mapped weights do not match the model (missing={missing}, unexpected={unexpected})")
+                return None
+            self.weights_mmapped = True
+            print(f"Memory-mapped model weights from {weights_path}")
+            return model
+        except Exception as e:
+            print(f"Could not memory-map {weights_path}: {e}")
+            print("Loading weights into private memory instead")
+            return None
 
     def analyze(self, text: str) -> Tuple[str, float]:
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts: List[str], timings: Optional[dict] = None) -> List[Tuple[str, float]]:
+        """Analyze several texts, running one padded forward pass per length bucket
+
+        Tokenize and forward times are recorded as metrics stages, and added
+        to timings when given.
+        """
         try:
-            # Tokenize the input text
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-            
-            # Remove token_type_ids if present (DistilBERT doesn't use them)
-            if 'token_type_ids' in inputs:
-                del inputs['token_type_ids']
-                
-            inputs = {name: tensor.to(self.device) for name, tensor in inputs.items()}
-
-            # Get model prediction
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probabilities = torch.nn.functional.softmax(outputs.logits, dim=1)
-
-            # Get prediction and confidence
-            prediction = torch.argmax(probabilities, dim=1)
-            confidence = torch.max(probabilities).item()
-
-            # Map prediction to sentiment
+            started = time.perf_counter()
+            encoded = self._encode(texts)
+            metrics.observe_stage("tokenize", time.perf_counter() - started, timings)
+            results = [None] * len(texts)
             sentiment_map = {0: "negative", 1: "positive"}
-            sentiment = sentiment_map[prediction.item()]
 
-            return sentiment, confidence
+            forward_seconds = 0.0
+            for bucket in self._buckets([len(ids) for ids in encoded]):
+                started = time.perf_counter()
+                input_ids, attention_mask = self._pad([encoded[i] for i in bucket])
+                probabilities = self._forward(input_ids, attention_mask)
+                forward_seconds += time.perf_counter() - started
+
+                # Get prediction and confidence for every row
+                confidences, predictions = torch.max(probabilities, dim=1)
+                for i, prediction, confidence in zip(bucket, predictions.tolist(), confidences.tolist()):
+                    results[i] = (sentiment_map[prediction], confidence)
+
+            metrics.observe_stage("forward", forward_seconds, timings)
+            return results
         except Exception as e:
             print(f"Error in sentiment analysis: {e}")
             # Return a default response in case of error
-            return "neutral", 0.5
+            return [FALLBACK_PREDICTION] * len(texts)
+
+    def _encode(self, texts: List[str]) -> List[List[int]]:
+        """Batch-encode texts with the fast tokenizer, truncating to MAX_SEQ_LENGTH tokens"""
+        budget = MAX_SEQ_LENGTH - self.tokenizer.num_special_tokens_to_add()
+        if TRUNCATION_MODE == "head_tail":
+            # Keep the opening and the closing of long reviews, where the verdict usually is
+            encoded = self.tokenizer(
+                texts, add_special_tokens=False, truncation=False,
+                return_attention_mask=False, return_token_type_ids=False
+            )["input_ids"]
+            head = min(HEAD_TOKENS, budget)
+            tail = budget - head
+            encoded = [
+                ids if len(ids) <= budget else ids[:head] + (ids[-tail:] if tail else [])
+                for ids in encoded
+            ]
+        else:
+            encoded = self.tokenizer(
+                texts, add_special_tokens=False, truncation=True, max_length=budget,
+                return_attention_mask=False, return_token_type_ids=False
+            )["input_ids"]
+        return [self.tokenizer.build_inputs_with_special_tokens(ids) for ids in encoded]
+
+    def _buckets(self, lengths: List[int]) -> List[List[int]]:
+        """Group text indices of similar token length, capping tokens per forward pass"""
+        boundaries = [b for b in BUCKET_BOUNDARIES if b < MAX_SEQ_LENGTH] + [MAX_SEQ_LENGTH]
+        buckets, current, current_bound = [], [], None
+        for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+            bound = next(b for b in boundaries if b >= lengths[i])
+            # Sorted order means lengths[i] is the padded length of the bucket
+            if current and (bound != current_bound or (len(current) + 1) * lengths[i] > MAX_BATCH_TOKENS):
+                buckets.append(current)
+                current = []
+            current.append(i)
+            current_bound = bound
+        if current:
+            buckets.append(current)
+        return buckets
+
+    def _pad(self, sequences: List[List[int]]):
+        """Right-pad token ids to the longest sequence in the bucket"""
+        batch_length = max(len(ids) for ids in sequences)
+        input_ids = torch.full((len(sequences), batch_length), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), batch_length), dtype=torch.long)
+        for row, ids in enumerate(sequences):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+        return input_ids, attention_mask
+
+    def _forward(self, input_ids, attention_mask):
+        """Return class probabilities for one padded bucket"""
+        if self.session is not None:
+            logits = self.session.run(
+                ["logits"], {"input_ids": input_ids.numpy(), "attention_mask": attention_mask.numpy()}
+            )[0]
+            return torch.nn.functional.softmax(torch.from_numpy(logits), dim=1)
+
+        with torch.inference_mode(), profiling.record_forward():
+            outputs = self.model(
+                input_ids=input_ids.to(self.device),
+                attention_mask=attention_mask.to(self.device)
+            )
+            return torch.nn.functional.softmax(outputs.logits, dim=1).cpu()
     
     def get_model_info(self) -> dict:
         """Return information about the model"""
         model_info = {
-            "model_type": self.model.config.model_type,
-            "hidden_size": self.model.config.hidden_size,
-            "num_labels": self.model.config.num_labels,
-            "vocab_size": self.model.config.vocab_size,
-            "device": str(self.device)
+            "model_type": self.config.model_type,
+            "hidden_size": self.config.hidden_size,
+            "num_labels": self.config.num_labels,
+            "vocab_size": self.config.vocab_size,
+            "device": str(self.device),
+            "backend": self.backend,
+            "weights_mmapped": self.weights_mmapped,
+            "model_version": self.model_version
         }
         
         # Try to load additional metrics from model_info.json if it exists
@@ -9,6 +9,9 @@ import string
 BASE_URL = "http://localhost:8001"
 TEST_EMAIL = "test@example.com"
 TEST_PASSWORD = "testpassword123"
+# The stats endpoints are admin-only: start the server with PROFILING_ADMINS=admin@example.com
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "adminpassword123"
 TEST_TEXT = "I really enjoyed this product. It exceeded my expectations!"
 
 def print_separator():
@@ -23,6 +26,104 @@ def test_health_check():
     assert response.json()["status"] == "healthy"
     print("✅ Health check test passed")
 
+def test_readiness():
+    print("Testing readiness endpoint...")
+    response = requests.get(f"{BASE_URL}/ready")
+    print(f"Status code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert "model_load" in response.json()["phases_seconds"]
+    print("✅ Readiness test passed")
+
+def test_inference_stats(admin_token):
+    print("Testing inference stats endpoint...")
+    headers = {
+        "Authorization": f"Bearer {admin_token}"
+    }
+    response = requests.get(f"{BASE_URL}/inference-stats", headers=headers)
+    print(f"Status code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    assert response.status_code == 200
+    result = response.json()
+    assert "queue_depth" in result
+    assert "avg_batch_size" in result
+    assert "wait_ms_p99" in result
+    print("✅ Inference stats test passed")
+
+def test_persistence_stats(admin_token):
+    print("Testing persistence stats endpoint...")
+    headers = {
+        "Authorization": f"Bearer {admin_token}"
+    }
+    response = requests.get(f"{BASE_URL}/persistence-stats", headers=headers)
+    print(f"Status code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    assert response.status_code == 200
+    result = response.json()
+    assert "queue_length" in result
+    assert "flush_ms_p95" in result
+    if result["mode"] != "async":
+        assert result["rows_written"] > 0
+    print("✅ Persistence stats test passed")
+
+def test_db_stats(admin_token):
+    print("Testing database pool stats endpoint...")
+    headers = {
+        "Authorization": f"Bearer {admin_token}"
+    }
+    response = requests.get(f"{BASE_URL}/db-stats", headers=headers)
+    print(f"Status code: {response.status_code}")
+    print(f"Response: {response.json()}")
+    assert response.status_code == 200
+    result = response.json()
+    assert "checkouts" in result
+    assert "wait_ms_p95" in result
+    print("✅ Database pool stats test passed")
+
+def test_stats_admin_only(token):
+    print("Testing stats endpoint access...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    for path in ("inference-stats", "persistence-stats", "db-stats", "auth-stats"):
+        response = requests.get(f"{BASE_URL}/{path}")
+        print(f"{path} without a token: {response.status_code}")
+        assert response.status_code == 401
+        # The freshly registered test user is never an admin
+        response = requests.get(f"{BASE_URL}/{path}", headers=headers)
+        print(f"{path} as a regular user: {response.status_code}")
+        assert response.status_code == 403
+    print("✅ Stats access test passed")
+
+def admin_login():
+    print("Logging in as the admin user...")
+    response = requests.post(f"{BASE_URL}/register", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    # Registered by an earlier run
+    assert response.status_code in (200, 400)
+    return test_login(ADMIN_EMAIL, ADMIN_PASSWORD)
+
+def test_request_id():
+    print("Testing request id header...")
+    response = requests.get(f"{BASE_URL}/health", headers={"X-Request-ID": "test-request-1"})
+    print(f"Status code: {response.status_code}")
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "test-request-1"
+    # Generated when the client sends none
+    assert requests.get(f"{BASE_URL}/health").headers.get("X-Request-ID")
+    print("✅ Request id test passed")
+
+def test_metrics():
+    print("Testing metrics endpoint...")
+    response = requests.get(f"{BASE_URL}/metrics")
+    print(f"Status code: {response.status_code}")
+    assert response.status_code == 200
+    # The analyze tests above have gone through every stage by now
+    assert "reviewsense_stage_seconds_bucket" in response.text
+    assert "reviewsense_http_requests_total" in response.text
+    assert "Server-Timing" in requests.get(f"{BASE_URL}/health").headers
+    print("✅ Metrics test passed")
+
 def test_register_user():
     print("Testing user registration...")
     email = random_email()
@@ -105,6 +206,29 @@ def test_analyze_sentiment_public():
     print("✅ Public sentiment analysis test passed")
     return result
 
+def test_analyze_batch(token):
+    print("Testing batch sentiment analysis...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    texts = [TEST_TEXT, "Terrible product, don't waste your money.", "Great!"]
+    response = requests.post(
+        f"{BASE_URL}/analyze-batch",
+        json={"texts": texts},
+        headers=headers
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+    print(f"Response: {results}")
+    assert sorted(result["index"] for result in results) == list(range(len(texts)))
+    for result in results:
+        assert "sentiment" in result
+        assert "confidence" in result
+    
+    print("✅ Batch sentiment analysis test passed")
+
 def test_model_info(token):
     print("Testing model info endpoint...")
     headers = {
@@ -127,6 +251,129 @@ def test_model_info(token):
     
     print("✅ Model info test passed")
 
+def test_model_metrics(token):
+    print("Testing model metrics endpoint...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.get(
+        f"{BASE_URL}/model-metrics",
+        headers=headers
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    result = response.json()
+    print(f"Response: {result}")
+    assert "accuracy" in result
+    assert "f1" in result
+    assert "Cache-Control" in response.headers
+    
+    # Served from memory until the metrics files change, so the ETag holds
+    headers["If-None-Match"] = response.headers["ETag"]
+    response = requests.get(f"{BASE_URL}/model-metrics", headers=headers)
+    assert response.status_code == 304
+    print("✅ Model metrics test passed")
+
+def test_history(token):
+    print("Testing analysis history endpoint...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.get(
+        f"{BASE_URL}/history",
+        headers=headers,
+        params={"limit": 1}
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    result = response.json()
+    print(f"Response: {result}")
+    assert len(result["items"]) <= 1
+    assert "next_cursor" in result
+    
+    # Unchanged page comes back as 304
+    headers["If-None-Match"] = response.headers["ETag"]
+    response = requests.get(f"{BASE_URL}/history", headers=headers, params={"limit": 1})
+    assert response.status_code == 304
+    print("✅ History test passed")
+
+def test_trends(token):
+    print("Testing sentiment trends endpoint...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.get(
+        f"{BASE_URL}/trends",
+        headers=headers,
+        params={"granularity": "hour"}
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    result = response.json()
+    print(f"Response: {result}")
+    assert result["granularity"] == "hour"
+    for bucket in result["buckets"]:
+        assert bucket["total"] == sum(bucket["confidence_histogram"])
+    print("✅ Trends test passed")
+
+def test_export(token):
+    print("Testing CSV export endpoint...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.get(
+        f"{BASE_URL}/export",
+        headers=headers,
+        params={"format": "csv"},
+        stream=True
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    print(f"Exported {len(lines) - 1} rows")
+    assert lines[0] == "id,created_at,sentiment,confidence,text"
+    assert len(lines) > 1
+    print("✅ Export test passed")
+
+def test_search(token):
+    print("Testing full-text search endpoint...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.get(
+        f"{BASE_URL}/search",
+        headers=headers,
+        params={"q": "product"}
+    )
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    result = response.json()
+    print(f"Response: {result}")
+    # test_analyze_sentiment stored TEST_TEXT for this user
+    assert any(item["text"] == TEST_TEXT for item in result["results"])
+    print("✅ Search test passed")
+
+def test_profile_admin_only(token):
+    print("Testing profiling endpoint access...")
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+    response = requests.post(
+        f"{BASE_URL}/admin/profile",
+        headers=headers,
+        params={"seconds": 1}
+    )
+    print(f"Status code: {response.status_code}")
+    # Needs the server started with PROFILING_ENABLED=true, otherwise the
+    # endpoint answers 404; the freshly registered test user is never an admin
+    assert response.status_code == 403
+    print("✅ Profiling access test passed")
+
 def test_user_profile(token):
     print("Testing user profile endpoint...")
     headers = {
@@ -160,6 +407,10 @@ def run_all_tests():
         test_health_check()
         print_separator()
         
+        # Test readiness
+        test_readiness()
+        print_separator()
+        
         # Test user registration
         email, password = test_register_user()
         if email and password:
@@ -174,10 +425,66 @@ def run_all_tests():
                 public_sentiment_result = test_analyze_sentiment_public()
                 print_separator()
                 
+                # Test batch sentiment analysis
+                test_analyze_batch(token)
+                print_separator()
+                
+                # Test that the stats endpoints are admin-only
+                test_stats_admin_only(token)
+                print_separator()
+                
+                admin_token = admin_login()
+                assert admin_token
+                print_separator()
+                
+                # Test batching stats after the analyze calls above
+                test_inference_stats(admin_token)
+                print_separator()
+                
+                # Test write-behind stats after the analyses were stored
+                test_persistence_stats(admin_token)
+                print_separator()
+                
+                # Test connection pool stats
+                test_db_stats(admin_token)
+                print_separator()
+                
+                # Test request id correlation
+                test_request_id()
+                print_separator()
+                
+                # Test Prometheus metrics
+                test_metrics()
+                print_separator()
+                
                 # Test model info
                 test_model_info(token)
                 print_separator()
                 
+                # Test model metrics
+                test_model_metrics(token)
+                print_separator()
+                
+                # Test analysis history
+                test_history(token)
+                print_separator()
+                
+                # Test full-text search
+                test_search(token)
+                print_separator()
+                
+                # Test sentiment trends
+                test_trends(token)
+                print_separator()
+                
+                # Test export of the analyses above
+                test_export(token)
+                print_separator()
+                
+                # Test that profiling is admin-only
+                test_profile_admin_only(token)
+                print_separator()
+                
                 # Test user profile
                 test_user_profile(token)
                 print_separator()
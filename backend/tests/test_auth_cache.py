@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+import auth_cache
+import schemas
+from auth_cache import UserCache, principal_from_claims, token_claims
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def user(email="alice@example.com", user_id=1):
+    return schemas.User(id=user_id, email=email, created_at=datetime(2024, 1, 2, 3, 4, 5))
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = UserCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", user())
+    clock[0] += 59
+    assert cache.get("alice@example.com") == user()
+    clock[0] += 2
+    assert cache.get("alice@example.com") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_invalidate_forgets_the_user(clock):
+    cache = UserCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", user())
+    cache.put("bob@example.com", user("bob@example.com", 2))
+    cache.invalidate("alice@example.com")
+    assert cache.get("alice@example.com") is None
+    assert cache.get("bob@example.com").id == 2
+    # Invalidating an unknown subject is harmless
+    cache.invalidate("carol@example.com")
+
+
+def test_least_recently_used_entry_is_evicted_at_max_size(clock):
+    cache = UserCache(ttl=60, max_size=2)
+    cache.put("alice@example.com", user())
+    cache.put("bob@example.com", user("bob@example.com", 2))
+    cache.get("alice@example.com")
+    cache.put("carol@example.com", user("carol@example.com", 3))
+    assert cache.get("bob@example.com") is None
+    assert cache.get("alice@example.com") is not None
+    assert cache.get("carol@example.com") is not None
+
+
+def test_zero_ttl_disables_the_cache(clock):
+    cache = UserCache(ttl=0, max_size=10)
+    cache.put("alice@example.com", user())
+    assert cache.get("alice@example.com") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_token_claims_round_trip_to_the_user():
+    assert principal_from_claims(token_claims(user())) == user()
+    # Tokens issued before the claims were added fall back to a lookup
+    assert principal_from_claims({"sub": "alice@example.com"}) is None
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from batching import BatcherStopped, MicroBatcher
+from inference_pool import InferencePool
+
+
+class StubModel:
+    """predict_batch stand-in that records every batch it is given"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts, timings):
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        if self.fail:
+            raise ValueError("forward failed")
+        return [(text, 0.9) for text in texts]
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(workers=1, max_pending=64)
+    yield pool
+    pool.shutdown()
+
+
+def test_full_batch_is_dispatched_without_waiting(pool):
+    model = StubModel()
+    batcher = MicroBatcher(model, pool, max_batch_size=4, max_wait_ms=60_000)
+
+    async def main():
+        try:
+            # A minute-long window: only reaching max_batch_size can flush it
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(f"t{i}") for i in range(4))), 5)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(main()) == [(f"t{i}", 0.9) for i in range(4)]
+    assert model.batches == [["t0", "t1", "t2", "t3"]]
+    assert pool.stats()["pending"] == 0
+
+
+def test_partial_batch_is_flushed_when_the_window_closes(pool):
+    model = StubModel()
+    batcher = MicroBatcher(model, pool, max_batch_size=16, max_wait_ms=20)
+
+    async def main():
+        try:
+            return await asyncio.gather(*(batcher.submit(f"t{i}") for i in range(3)))
+        finally:
+            await batcher.stop()
+
+    assert len(asyncio.run(main())) == 3
+    assert model.batches == [["t0", "t1", "t2"]]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["items"], stats["largest_batch"]) == (1, 3, 3)
+    assert stats["wait_ms_max"] >= 15
+
+
+def test_batch_failure_reaches_every_caller(pool):
+    batcher = MicroBatcher(StubModel(fail=True), pool, max_batch_size=3, max_wait_ms=60_000)
+
+    async def main():
+        try:
+            return await asyncio.gather(*(batcher.submit(f"t{i}") for i in range(3)), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert pool.stats()["pending"] == 0
+
+
+def test_stop_finishes_running_batches_and_fails_queued_requests(pool):
+    model = StubModel()
+    model.release.clear()
+    batcher = MicroBatcher(model, pool, max_batch_size=1, max_wait_ms=0)
+
+    async def main():
+        running = asyncio.ensure_future(batcher.submit("running"))
+        await asyncio.sleep(0.05)
+        # The only pool worker is busy, so these wait in the queue
+        queued = [asyncio.ensure_future(batcher.submit(f"queued{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0.05)
+        model.release.set()
+        await stopping
+        return await asyncio.gather(running, *queued, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert results[0] == ("running", 0.9)
+    assert all(isinstance(result, BatcherStopped) for result in results[1:])
+    assert model.batches == [["running"]]
+    assert pool.stats()["pending"] == 0
+
+
+def test_stop_fails_a_batch_still_being_collected(pool):
+    model = StubModel()
+    batcher = MicroBatcher(model, pool, max_batch_size=16, max_wait_ms=60_000)
+
+    async def main():
+        waiting = [asyncio.ensure_future(batcher.submit(f"t{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        # Resolved by stop(), not left hanging
+        return await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, BatcherStopped) for result in results)
+    assert model.batches == []
@@ -0,0 +1,59 @@
+import pytest
+
+import benchmark
+
+
+def test_make_texts_is_reproducible_and_sized_in_tokens():
+    texts = benchmark.make_texts(5, 32)
+    assert texts == benchmark.make_texts(5, 32)
+    assert texts != benchmark.make_texts(5, 32, seed=1)
+    # Every word is one token; the other two are [CLS] and [SEP]
+    assert all(len(text.split()) == 30 for text in texts)
+    assert all(word in benchmark.WORDS for text in texts for word in text.split())
+    assert len(benchmark.make_texts(1, 1)[0].split()) == 1
+
+
+def test_percentile_interpolates_between_samples():
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert benchmark.percentile(values, 0) == 1.0
+    assert benchmark.percentile(values, 50) == pytest.approx(2.5)
+    assert benchmark.percentile(values, 95) == pytest.approx(3.85)
+    assert benchmark.percentile(values, 100) == 4.0
+    assert benchmark.percentile([7.0], 99) == 7.0
+    assert benchmark.percentile([], 50) == 0.0
+
+
+def test_summarize_reports_milliseconds_and_items_per_second():
+    result = benchmark.summarize("model/x", {"batch_size": 8}, [0.010, 0.020, 0.030], items=24, elapsed=0.5, errors=1)
+    assert result["name"] == "model/x" and result["batch_size"] == 8
+    assert (result["calls"], result["errors"]) == (3, 1)
+    assert result["throughput"] == pytest.approx(48.0)
+    assert result["mean_ms"] == pytest.approx(20.0)
+    assert result["p50_ms"] == pytest.approx(20.0)
+    assert benchmark.summarize("empty", {}, [], items=0, elapsed=0)["throughput"] == 0.0
+
+
+def result(name, throughput, p95_ms, errors=0):
+    return {"name": name, "throughput": throughput, "p95_ms": p95_ms, "errors": errors}
+
+
+def test_compare_flags_only_changes_beyond_tolerance():
+    baseline = {"results": [
+        result("steady", 100.0, 50.0),
+        result("slower", 100.0, 50.0),
+        result("laggier", 100.0, 50.0),
+        result("failing", 100.0, 50.0),
+    ]}
+    regressions = benchmark.compare([
+        result("steady", 95.0, 54.0),
+        result("slower", 80.0, 50.0),
+        result("laggier", 100.0, 60.0),
+        result("failing", 100.0, 50.0, errors=2),
+        result("new", 1.0, 1000.0),
+    ], baseline, tolerance=0.1)
+    assert regressions == ["slower", "laggier", "failing"]
+
+
+def test_list_arguments():
+    assert benchmark.int_list("1,8,32,") == [1, 8, 32]
+    assert benchmark.str_list("pytorch,onnx") == ["pytorch", "onnx"]
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+import bulk
+from inference_pool import InferencePool, InferenceQueueFull
+
+
+class StubAnalyzer:
+    def __init__(self, fail_on_call=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def analyze_batch(self, texts):
+        self.calls.append(list(texts))
+        if len(self.calls) == self.fail_on_call:
+            raise RuntimeError("forward failed")
+        return [("positive" if "good" in text else "negative", 0.9) for text in texts]
+
+
+class StubWriter:
+    def __init__(self):
+        self.rows = []
+
+    async def record_many(self, rows):
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    pool = InferencePool(workers=1, max_pending=4)
+    yield pool
+    pool.shutdown()
+
+
+TEXTS = ["a good long review", "bad", "good one", "quite bad review"]
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_chunks_are_length_sorted_and_lines_keep_request_indices(pool):
+    analyzer, writer = StubAnalyzer(), StubWriter()
+    chunks = asyncio.run(collect(bulk.stream_batch_analysis(TEXTS, analyzer, pool, writer, 2, user_id=7)))
+
+    assert analyzer.calls == [["bad", "good one"], ["quite bad review", "a good long review"]]
+    assert len(chunks) == 2
+    lines = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [line["index"] for line in lines] == [1, 2, 3, 0]
+    assert [line["sentiment"] for line in lines] == ["negative", "positive", "negative", "positive"]
+    assert sorted(row["text"] for row in writer.rows) == sorted(TEXTS)
+    assert all(row["user_id"] == 7 for row in writer.rows)
+
+
+def test_failure_after_the_first_chunk_is_reported_in_band(pool):
+    analyzer, writer = StubAnalyzer(fail_on_call=2), StubWriter()
+    chunks = asyncio.run(collect(bulk.stream_batch_analysis(TEXTS, analyzer, pool, writer, 2)))
+
+    assert len(chunks) == 2
+    assert json.loads(chunks[-1]) == {"error": "Batch analysis failed"}
+    # Only the chunk that succeeded was stored
+    assert len(writer.rows) == 2
+
+
+def serve(response, fail_send_after=None):
+    """Run the ASGI response against a client that never disconnects; return the body"""
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and len(sent) == fail_send_after:
+            raise OSError("connection reset")
+        sent.append(message)
+
+    async def main():
+        await response({"type": "http"}, receive, send)
+
+    asyncio.run(main())
+    return b"".join(message.get("body", b"") for message in sent)
+
+
+def test_response_releases_its_reservation_once_streamed(pool):
+    response = bulk.batch_response(TEXTS, StubAnalyzer(), pool, StubWriter())
+    assert pool.stats()["pending"] == 2
+    body = serve(response)
+    assert len(body.decode().splitlines()) == 4
+    assert pool.stats()["pending"] == 0
+
+
+def test_response_releases_its_reservation_when_the_send_fails(pool):
+    response = bulk.batch_response(TEXTS, StubAnalyzer(), pool, StubWriter())
+    # Headers go out, then the first body chunk fails; anyio may wrap the OSError in a group
+    with pytest.raises(Exception):
+        serve(response, fail_send_after=1)
+    assert pool.stats()["pending"] == 0
+
+
+def test_saturated_pool_rejects_the_batch_before_streaming(pool):
+    pool.reserve(3)
+    with pytest.raises(InferenceQueueFull):
+        bulk.batch_response(TEXTS, StubAnalyzer(), pool, StubWriter())
+    assert pool.stats()["pending"] == 3
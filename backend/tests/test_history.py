@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import history
+
+
+def test_cursor_round_trips_keyset_position():
+    created_at = datetime(2026, 3, 1, 10, 15, 30, 123456, tzinfo=timezone.utc)
+    cursor = history.encode_cursor(created_at, 4217)
+    assert "=" not in cursor
+    assert history.decode_cursor(cursor) == (created_at, 4217)
+
+
+def test_cursor_keeps_naive_timestamps_naive():
+    created_at = datetime(2026, 3, 1, 10, 15)
+    decoded, id = history.decode_cursor(history.encode_cursor(created_at, 1))
+    assert decoded == created_at and decoded.tzinfo is None
+
+
+def test_missing_cursor_means_first_page():
+    assert history.decode_cursor(None) is None
+    assert history.decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", "WyJub3QgYSBkYXRlIiwgMV0", "WzFd"])
+def test_malformed_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as exc:
+        history.decode_cursor(cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from batching import BatcherStopped, MicroBatcher
+from inference_pool import InferencePool, InferenceQueueFull
+
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(workers=1, max_pending=3)
+    yield pool
+    pool.shutdown()
+
+
+def test_reserve_rejects_beyond_max_pending(pool):
+    pool.reserve(2)
+    with pytest.raises(InferenceQueueFull):
+        pool.reserve(2)
+    pool.reserve()
+    stats = pool.stats()
+    assert (stats["pending"], stats["rejected"]) == (3, 2)
+    pool.release(3)
+    # Releasing more than was reserved never goes negative
+    pool.release()
+    assert pool.stats()["pending"] == 0
+
+
+def test_run_executes_off_the_event_loop(pool):
+    async def main():
+        return await pool.run(threading.current_thread), threading.current_thread()
+
+    worker, loop_thread = asyncio.run(main())
+    assert worker is not loop_thread
+    assert worker.name.startswith("inference")
+
+
+def test_saturated_batcher_rejects_at_once_instead_of_queueing(pool):
+    release = threading.Event()
+
+    def predict_batch(texts, timings):
+        release.wait(5)
+        return [("positive", 0.9)] * len(texts)
+
+    batcher = MicroBatcher(predict_batch, pool, max_batch_size=1, max_wait_ms=0)
+
+    async def main():
+        accepted = [asyncio.ensure_future(batcher.submit(f"t{i}")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        # The pool's three slots are all held; the fourth caller gets a 503 straight away
+        with pytest.raises(InferenceQueueFull):
+            await asyncio.wait_for(batcher.submit("t3"), 1)
+        release.set()
+        results = await asyncio.gather(*accepted)
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(main()) == [("positive", 0.9)] * 3
+    stats = pool.stats()
+    assert (stats["pending"], stats["rejected"]) == (0, 1)
+
+
+def test_requests_failed_by_stop_are_answered_like_a_full_queue():
+    # The app's InferenceQueueFull handler turns both into a 503 with Retry-After
+    assert issubclass(BatcherStopped, InferenceQueueFull)
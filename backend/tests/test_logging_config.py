@@ -0,0 +1,40 @@
+import logging
+import queue
+import sys
+
+import logging_config
+
+
+def test_user_ref_hides_the_address_but_stays_stable():
+    ref = str(logging_config.user_ref("Alice@Example.com "))
+    assert ref == str(logging_config.user_ref("alice@example.com"))
+    assert ref != str(logging_config.user_ref("bob@example.com"))
+    assert "alice" not in ref and len(ref) == 12
+
+
+def test_user_ref_is_not_hashed_when_the_line_is_dropped(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(logging_config.UserRef, "__str__", lambda self: hashed.append(self.email) or "ref")
+    logger = logging.getLogger("test_logging_config.lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("Login attempt for user: %s", logging_config.user_ref("alice@example.com"))
+    assert hashed == []
+
+
+def test_queued_records_carry_only_rendered_text():
+    handler = logging_config.DeferredQueueHandler(queue.Queue())
+    mutable = {"rows": 1}
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("sqlalchemy", logging.ERROR, __file__, 1, "state %s", (mutable,), sys.exc_info())
+    handler.handle(record)
+    mutable["rows"] = 2
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "state {'rows': 1}"
+    assert queued.args is None and queued.exc_info is None
+    assert "ValueError: boom" in queued.exc_text
+    formatted = logging_config.JsonFormatter().format(queued)
+    assert "ValueError: boom" in formatted
+    # The caller's record is left as it was
+    assert record.exc_info is not None
@@ -0,0 +1,67 @@
+import json
+
+import model_metadata
+
+
+def write_runs(path, runs, tail=""):
+    with open(path, "w") as f:
+        for run in runs:
+            f.write(json.dumps(run) + "\n")
+        f.write(tail)
+
+
+def test_latest_run_is_the_last_complete_line(tmp_path):
+    path = str(tmp_path / "runs.jsonl")
+    write_runs(path, [{"run_id": "a"}, {"run_id": "b"}], tail='{"run_id": "to')
+    assert model_metadata.read_latest_run(path) == {"run_id": "b"}
+
+
+def test_latest_run_longer_than_the_first_block(tmp_path):
+    path = str(tmp_path / "runs.jsonl")
+    write_runs(path, [{"run_id": "a"}, {"run_id": "b", "notes": "x" * 50000}])
+    assert model_metadata.read_latest_run(path)["run_id"] == "b"
+
+
+def test_latest_run_of_a_missing_or_empty_store(tmp_path):
+    assert model_metadata.read_latest_run(str(tmp_path / "missing.jsonl")) is None
+    (tmp_path / "empty.jsonl").write_text("\n")
+    assert model_metadata.read_latest_run(str(tmp_path / "empty.jsonl")) is None
+
+
+def test_metrics_come_from_the_newest_run(tmp_path, monkeypatch):
+    path = str(tmp_path / "runs.jsonl")
+    write_runs(path, [
+        {"run_id": "old", "metrics": {"accuracy": 0.8}},
+        {"run_id": "new", "created_at": "2026-03-01T00:00:00+00:00", "model_hash": "abc",
+         "num_examples": 10, "metrics": {"accuracy": 0.9, "f1": 0.88, "loss": 0.3}},
+    ])
+    monkeypatch.setattr(model_metadata, "EVAL_STORE_PATH", path)
+    metrics, paths = model_metadata.build_model_metrics()
+    assert metrics == {
+        "accuracy": 0.9, "f1": 0.88, "timestamp": "2026-03-01T00:00:00+00:00",
+        "run_id": "new", "model_hash": "abc", "num_examples": 10,
+    }
+    assert paths == [path]
+
+
+def test_metrics_fall_back_to_samples_without_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_metadata, "EVAL_STORE_PATH", str(tmp_path / "runs.jsonl"))
+    monkeypatch.setenv("MODEL_PATH", str(tmp_path))
+    metrics, paths = model_metadata.build_model_metrics()
+    assert {name: metrics[name] for name in model_metadata.SAMPLE_METRICS} == model_metadata.SAMPLE_METRICS
+    assert paths == [str(tmp_path / "runs.jsonl"), str(tmp_path / "model_info.json")]
+
+
+def test_watched_document_rebuilds_only_when_a_file_changes(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text('{"v": 1}')
+    document = model_metadata.WatchedDocument(
+        "test", lambda: (json.loads(path.read_text()), [str(path)]), check_interval=0
+    )
+    body, etag = document.get()
+    assert json.loads(body) == {"v": 1}
+    document._signature = model_metadata.file_signature([str(path)])
+    assert document.get() == (body, etag) and document.builds == 1
+    path.write_text('{"v": 22}')
+    body, new_etag = document.get()
+    assert json.loads(body) == {"v": 22} and new_etag != etag
@@ -0,0 +1,83 @@
+"""Monthly partition helpers
+
+The create/drop tests run against a scratch partitioned table and need a
+Postgres: set TEST_DATABASE_URL to enable them.
+"""
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import partitions
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCRATCH_TABLE = "partition_test_analyses"
+
+
+@pytest.mark.parametrize("month, n, expected", [
+    (date(2026, 3, 1), 0, date(2026, 3, 1)),
+    (date(2026, 3, 1), 1, date(2026, 4, 1)),
+    (date(2026, 11, 1), 3, date(2027, 2, 1)),
+    (date(2026, 1, 1), -1, date(2025, 12, 1)),
+    (date(2026, 3, 1), -27, date(2023, 12, 1)),
+])
+def test_add_months(month, n, expected):
+    assert partitions.add_months(month, n) == expected
+
+
+def test_partition_names_sort_chronologically():
+    months = [partitions.add_months(date(2025, 6, 1), n) for n in range(12)]
+    names = [partitions.partition_name(month) for month in months]
+    assert names[0] == "sentiment_analyses_p2025_06"
+    assert names[7] == "sentiment_analyses_p2026_01"
+    assert sorted(names) == names
+
+
+@pytest.fixture
+def scratch_table(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    monkeypatch.setattr(partitions, "TABLE", SCRATCH_TABLE)
+    monkeypatch.setattr(partitions, "current_month", lambda: date(2026, 3, 1))
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE} CASCADE"))
+        connection.execute(text(
+            f"CREATE TABLE {SCRATCH_TABLE} (id bigint, created_at timestamptz NOT NULL) PARTITION BY RANGE (created_at)"
+        ))
+        connection.execute(text(f"CREATE TABLE {SCRATCH_TABLE}_default PARTITION OF {SCRATCH_TABLE} DEFAULT"))
+    try:
+        yield engine
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {SCRATCH_TABLE} CASCADE"))
+        engine.dispose()
+
+
+def test_ensure_partitions_creates_missing_months_once(scratch_table):
+    with scratch_table.begin() as connection:
+        assert partitions.is_partitioned(connection)
+        created = partitions.ensure_partitions(connection, months_ahead=2)
+        assert created == [f"{SCRATCH_TABLE}_p2026_03", f"{SCRATCH_TABLE}_p2026_04", f"{SCRATCH_TABLE}_p2026_05"]
+        assert partitions.ensure_partitions(connection, months_ahead=3) == [f"{SCRATCH_TABLE}_p2026_06"]
+        connection.execute(text(f"INSERT INTO {SCRATCH_TABLE} VALUES (1, '2026-04-30 23:59:59+00')"))
+        routed = connection.execute(text(f"SELECT tableoid::regclass::text FROM {SCRATCH_TABLE}")).scalar()
+        assert routed == f"{SCRATCH_TABLE}_p2026_04"
+
+
+def test_drop_expired_partitions_keeps_retention_window_and_default(scratch_table):
+    with scratch_table.begin() as connection:
+        partitions.ensure_partitions(connection, months_ahead=0)
+        for month in (date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)):
+            connection.execute(text(
+                f"CREATE TABLE {partitions.partition_name(month)} PARTITION OF {SCRATCH_TABLE} "
+                f"FOR VALUES FROM ('{month}') TO ('{partitions.add_months(month, 1)}')"
+            ))
+        assert partitions.drop_expired_partitions(connection, retention_months=0) == []
+        dropped = partitions.drop_expired_partitions(connection, retention_months=2)
+        assert dropped == [f"{SCRATCH_TABLE}_p2025_12"]
+        assert partitions.list_partitions(connection) == [
+            f"{SCRATCH_TABLE}_default", f"{SCRATCH_TABLE}_p2026_01",
+            f"{SCRATCH_TABLE}_p2026_02", f"{SCRATCH_TABLE}_p2026_03",
+        ]
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from contextlib import ExitStack
+
+import pytest
+
+import password_hashing
+from password_hashing import LoginRateLimiter, PasswordHasher, PasswordHasherBusy, TooManyAttempts
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(password_hashing.time, "monotonic", lambda: now[0])
+    return now
+
+
+def fail(limiter, account):
+    with limiter.attempt(account):
+        limiter.record_failure(account)
+
+
+def test_failures_lock_the_account_until_the_window_passes(clock):
+    limiter = LoginRateLimiter(max_failures=3, window=60)
+    for _ in range(3):
+        fail(limiter, "alice")
+    with pytest.raises(TooManyAttempts) as exc:
+        with limiter.attempt("alice"):
+            pass
+    assert exc.value.retry_after == pytest.approx(60)
+    with limiter.attempt("bob"):
+        pass
+    clock[0] += 61
+    with limiter.attempt("alice"):
+        pass
+    assert limiter.stats()["blocked_attempts"] == 1
+
+
+def test_success_clears_the_account(clock):
+    limiter = LoginRateLimiter(max_failures=2, window=60)
+    fail(limiter, "alice")
+    with limiter.attempt("alice"):
+        pass
+    limiter.reset("alice")
+    fail(limiter, "alice")
+    with limiter.attempt("alice"):
+        pass
+
+
+def test_attempts_in_progress_count_against_the_budget(clock):
+    limiter = LoginRateLimiter(max_failures=3, window=60)
+    with ExitStack() as stack:
+        for _ in range(3):
+            stack.enter_context(limiter.attempt("alice"))
+        assert limiter.stats()["attempts_in_progress"] == 3
+        with pytest.raises(TooManyAttempts):
+            stack.enter_context(limiter.attempt("alice"))
+    # Finished attempts release their slot whether or not they failed
+    assert limiter.stats()["attempts_in_progress"] == 0
+    with limiter.attempt("alice"):
+        pass
+
+
+def test_parallel_guesses_cannot_exceed_the_limit():
+    limiter = LoginRateLimiter(max_failures=5, window=60)
+    checked = []
+
+    async def guess():
+        with limiter.attempt("alice"):
+            # bcrypt verify: every guess is in flight before any failure is recorded
+            await asyncio.sleep(0.01)
+            checked.append(True)
+            limiter.record_failure("alice")
+
+    async def main():
+        return await asyncio.gather(*(guess() for _ in range(20)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(checked) == 5
+    assert sum(isinstance(result, TooManyAttempts) for result in results) == 15
+
+
+def test_an_exception_releases_the_attempt(clock):
+    limiter = LoginRateLimiter(max_failures=1, window=60)
+    with pytest.raises(PasswordHasherBusy):
+        with limiter.attempt("alice"):
+            raise PasswordHasherBusy("queue is full")
+    with limiter.attempt("alice"):
+        pass
+
+
+def test_expired_accounts_are_swept(clock):
+    limiter = LoginRateLimiter(max_failures=3, window=60)
+    for i in range(100):
+        fail(limiter, f"spray-{i}@example.com")
+    assert limiter.stats()["tracked_accounts"] == 100
+    clock[0] += 61
+    fail(limiter, "alice")
+    assert limiter.stats()["tracked_accounts"] == 1
+
+
+def test_tracked_accounts_are_capped_evicting_the_stalest(clock):
+    limiter = LoginRateLimiter(max_failures=2, window=60, max_accounts=3)
+    fail(limiter, "alice")
+    fail(limiter, "alice")
+    for account in ("a", "b", "c"):
+        clock[0] += 1
+        fail(limiter, account)
+    stats = limiter.stats()
+    assert (stats["tracked_accounts"], stats["evicted_accounts"]) == (3, 1)
+    # alice failed least recently, so she was forgotten first
+    with limiter.attempt("alice"):
+        pass
+
+
+def test_disabled_limiter_never_blocks(clock):
+    limiter = LoginRateLimiter(max_failures=0, window=60)
+    for _ in range(10):
+        fail(limiter, "alice")
+    assert limiter.stats()["tracked_accounts"] == 0
+
+
+class BlockingContext:
+    """CryptContext stand-in whose hash blocks until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return f"hashed:{password}"
+
+    def verify(self, password, hashed):
+        return hashed == f"hashed:{password}"
+
+
+def test_hasher_rejects_calls_beyond_max_pending():
+    context = BlockingContext()
+    hasher = PasswordHasher(context, workers=1, max_pending=2)
+
+    async def main():
+        first = asyncio.ensure_future(hasher.hash("one"))
+        second = asyncio.ensure_future(hasher.hash("two"))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("three")
+        context.release.set()
+        return await asyncio.gather(first, second)
+
+    try:
+        assert asyncio.run(main()) == ["hashed:one", "hashed:two"]
+        stats = hasher.stats()
+        assert (stats["pending"], stats["rejected"], stats["operations"]) == (0, 1, 2)
+        assert asyncio.run(hasher.verify("one", "hashed:one"))
+    finally:
+        hasher.shutdown()
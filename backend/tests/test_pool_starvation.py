@@ -0,0 +1,67 @@
+"""Concurrent /analyze calls must not starve the analysis writer of connections
+
+Needs a Postgres to run against: set TEST_DATABASE_URL (and MODEL_PATH if the
+model is not in the default place). The app runs in a subprocess, since the
+pool settings are read when database.py is imported.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIO = textwrap.dedent('''
+    import asyncio, sys, uuid
+    import httpx
+    from app import app
+
+    async def main():
+        await app.router.startup()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+                credentials = {"email": f"pool-{uuid.uuid4().hex[:8]}@example.com", "password": "pool-password"}
+                (await client.post("/register", json=credentials)).raise_for_status()
+                response = await client.post("/token", data={"username": credentials["email"], "password": credentials["password"]})
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+                responses = await asyncio.gather(*(
+                    client.post("/analyze", json={"text": f"pool starvation {i} {uuid.uuid4().hex}"}, headers=headers)
+                    for i in range(CONCURRENCY)
+                ))
+                statuses = sorted(response.status_code for response in responses)
+                print(statuses)
+                sys.exit(0 if statuses == [200] * CONCURRENCY else 1)
+        finally:
+            await app.router.shutdown()
+
+    asyncio.run(main())
+''')
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_concurrent_cache_misses_do_not_starve_writer():
+    pool_size, max_overflow = 2, 1
+    env = {
+        **os.environ,
+        "DATABASE_URL": TEST_DATABASE_URL,
+        "DB_POOL_SIZE": str(pool_size),
+        "DB_MAX_OVERFLOW": str(max_overflow),
+        "DB_POOL_TIMEOUT": "5",
+        # Every request looks its user up in the database
+        "AUTH_CACHE_TTL": "0",
+        "PERSIST_MODE": "batched",
+        "PERSIST_RETRIES": "1",
+        "STARTUP_MODE": "eager",
+        "PREDICTION_CACHE_SIZE": "0",
+    }
+    # More requests than connections, all waiting on the writer at once
+    script = f"CONCURRENCY = {4 * (pool_size + max_overflow)}\n" + SCENARIO
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr[-3000:]
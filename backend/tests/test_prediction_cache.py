@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "time", clock)
+    return clock
+
+
+def test_hits_fold_case_and_whitespace():
+    cache = PredictionCache("v1", max_size=10, ttl=0, path=None)
+    cache.put("Great  product", ("positive", 0.9))
+    assert cache.get("great product") == ("positive", 0.9)
+    assert cache.get("bad product") is None
+    assert (cache.memory_hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache("v1", max_size=10, ttl=60, path=None)
+    cache.put("text", ("negative", 0.7))
+    clock.now += 59
+    assert cache.get("text") == ("negative", 0.7)
+    clock.now += 2
+    assert cache.get("text") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache("v1", max_size=2, ttl=0, path=None)
+    cache.put("a", ("positive", 0.9))
+    cache.put("b", ("positive", 0.8))
+    cache.get("a")
+    cache.put("c", ("negative", 0.6))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_new_model_version_misses_old_entries_without_deleting_them(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache("v1", max_size=10, ttl=0, path=path)
+    cache.put("text", ("positive", 0.9))
+    cache.flush()
+    cache.set_model_version("v2")
+    assert cache.get("text") is None
+    # A worker still on the old model during a rolling deploy keeps its entries
+    assert PredictionCache("v1", max_size=10, ttl=0, path=path).get("text") == ("positive", 0.9)
+
+
+def test_only_expired_rows_are_purged_from_disk(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = PredictionCache("v1", max_size=10, ttl=60, path=path)
+    cache.put("old", ("positive", 0.9))
+    cache.flush()
+    clock.now += 30
+    cache.put("new", ("negative", 0.8))
+    cache.flush()
+    clock.now += 45
+    cache.set_model_version("v2")
+    cache.flush()
+    rows = sqlite3.connect(path).execute("SELECT model_version, expires_at FROM predictions").fetchall()
+    assert rows == [("v1", 1090.0)]
+
+
+def test_disk_tier_is_shared_and_read_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = PredictionCache("v1", max_size=10, ttl=0, path=path)
+    writer.put("shared", ("positive", 0.95))
+    writer.put("other", ("negative", 0.55))
+    writer.flush()
+    assert writer.stats()["disk_pending_writes"] == 0
+
+    reader = PredictionCache("v1", max_size=10, ttl=0, path=path)
+    results = asyncio.run(reader.lookup_many(["shared", "missing", "other"]))
+    assert results == [("positive", 0.95), None, ("negative", 0.55)]
+    assert (reader.disk_hits, reader.misses) == (2, 1)
+    # Disk hits are promoted to memory
+    assert asyncio.run(reader.lookup("shared")) == ("positive", 0.95)
+    assert reader.memory_hits == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache("v1", max_size=0, path=None)
+    cache.put("text", ("positive", 0.9))
+    assert asyncio.run(cache.lookup("text")) is None
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import models
+import rollups
+from database import Base
+
+UTC = timezone.utc
+
+
+def row(sentiment, confidence, created_at, user_id=7):
+    return {"user_id": user_id, "sentiment": sentiment, "confidence": confidence, "created_at": created_at}
+
+
+def test_accumulate_counts_hour_and_day_buckets():
+    buckets = {}
+    rollups.accumulate(buckets, [
+        row("positive", 0.95, datetime(2026, 3, 1, 10, 15, tzinfo=UTC)),
+        row("negative", 0.62, datetime(2026, 3, 1, 10, 59, tzinfo=UTC)),
+        row("positive", 0.51, datetime(2026, 3, 1, 23, 0, tzinfo=UTC)),
+    ])
+    hour = buckets[(7, "hour", datetime(2026, 3, 1, 10, tzinfo=UTC))]
+    assert (hour["total"], hour["positive"], hour["negative"]) == (2, 1, 1)
+    assert hour["confidence_sum"] == pytest.approx(1.57)
+    assert (hour["confidence_90"], hour["confidence_60"]) == (1, 1)
+    day = buckets[(7, "day", datetime(2026, 3, 1, tzinfo=UTC))]
+    assert (day["total"], day["positive"], day["confidence_50"]) == (3, 2, 1)
+    assert len(buckets) == 3
+
+
+def test_accumulate_buckets_in_utc_and_files_anonymous_rows_under_user_0():
+    buckets = {}
+    # 01:30 at UTC+2 is 23:30 UTC the previous day; naive times count as UTC
+    rollups.accumulate(buckets, [
+        row("neutral", 0.7, datetime(2026, 3, 2, 1, 30, tzinfo=timezone(timedelta(hours=2))), user_id=None),
+        row("positive", 1.0, datetime(2026, 3, 1, 23, 45), user_id=None),
+    ])
+    day = buckets[(rollups.ANONYMOUS_USER_ID, "day", datetime(2026, 3, 1, tzinfo=UTC))]
+    assert (day["total"], day["neutral"], day["positive"]) == (2, 1, 1)
+    # Confidence 1.0 lands in the top band rather than past it
+    assert day["confidence_90"] == 1
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def stored(db, granularity):
+    rollup = models.SentimentRollup
+    query = select(rollup.bucket_start, rollup.total).where(rollup.granularity == granularity)
+    return {start.replace(tzinfo=UTC): total for start, total in db.execute(query)}
+
+
+def test_rebuild_leaves_unsettled_buckets_to_insert_time_updates(db):
+    now = datetime.now(UTC)
+    old = now - timedelta(days=3)
+    rows = [row("positive", 0.9, old, user_id=None) for _ in range(3)] + [row("negative", 0.8, now, user_id=None)]
+    db.execute(insert(models.SentimentAnalysis), [{**r, "text": "t"} for r in rows])
+    # Drifted counts for the old hour, and the insert-time count for the current one
+    rollups.apply_rows(db, rows[:1] + rows[3:])
+    db.commit()
+
+    assert rollups.rebuild_rollups(db, now - timedelta(days=5)) == 3
+    hours = stored(db, "hour")
+    assert hours[rollups.bucket_start(old, "hour")] == 3
+    assert hours[rollups.bucket_start(now, "hour")] == 1
+    assert stored(db, "day")[rollups.bucket_start(old, "day")] == 3
+
+
+def test_full_rebuild_replaces_every_bucket(db):
+    now = datetime.now(UTC)
+    rows = [row("negative", 0.8, now, user_id=None) for _ in range(2)]
+    db.execute(insert(models.SentimentAnalysis), [{**r, "text": "t"} for r in rows])
+    db.commit()
+
+    assert rollups.rebuild_rollups(db, now - timedelta(days=1), settle_seconds=None) == 2
+    assert stored(db, "hour") == {rollups.bucket_start(now, "hour"): 2}
+    assert stored(db, "day") == {rollups.bucket_start(now, "day"): 2}
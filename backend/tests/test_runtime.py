@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import runtime
+
+
+class StubBatcher:
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+def lazy_runtime(monkeypatch, failures, max_attempts=0):
+    """A lazy-mode runtime whose database fails `failures` times, with the model load stubbed out"""
+    monkeypatch.setattr(runtime, "STARTUP_MODE", "lazy")
+    monkeypatch.setattr(runtime, "STARTUP_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(runtime, "STARTUP_RETRY_MAX_SECONDS", 0.02)
+    monkeypatch.setattr(runtime, "STARTUP_MAX_ATTEMPTS", max_attempts)
+    events = []
+
+    def init_database():
+        events.append("connect")
+        if events.count("connect") <= failures:
+            raise ConnectionError("database is down")
+
+    service = runtime.ServiceRuntime(init_database)
+
+    async def start_jobs():
+        events.append("jobs")
+
+    def load():
+        events.append("load")
+        service.batcher = StubBatcher()
+
+    service._start_jobs = start_jobs
+    service.load = load
+    return service, events
+
+
+async def start_and_wait(service):
+    await service.start()
+    statuses = []
+    while not service._task.done():
+        statuses.append(service.status()["status"])
+        await asyncio.sleep(0.005)
+    return statuses
+
+
+def test_lazy_startup_retries_the_database_then_starts_jobs(monkeypatch):
+    service, events = lazy_runtime(monkeypatch, failures=3)
+    statuses = asyncio.run(start_and_wait(service))
+    assert events == ["connect"] * 4 + ["jobs", "load"]
+    assert "failed" not in statuses
+    status = service.status()
+    assert status["status"] == "ready" and status["error"] is None
+    assert status["database_attempts"] == 4
+    service.pool.shutdown()
+
+
+def test_lazy_startup_gives_up_after_max_attempts_without_starting_jobs(monkeypatch):
+    service, events = lazy_runtime(monkeypatch, failures=10, max_attempts=2)
+    asyncio.run(start_and_wait(service))
+    assert events == ["connect", "connect"]
+    status = service.status()
+    assert status["status"] == "failed" and status["error"] == "database is down"
+    service.pool.shutdown()
+
+
+def test_eager_startup_fails_before_starting_jobs(monkeypatch):
+    service, events = lazy_runtime(monkeypatch, failures=1)
+    monkeypatch.setattr(runtime, "STARTUP_MODE", "eager")
+    with pytest.raises(ConnectionError):
+        asyncio.run(service.start())
+    assert events == ["connect"]
+    service.pool.shutdown()
@@ -0,0 +1,151 @@
+import pytest
+import torch
+from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+import sentiment_model
+from sentiment_model import SentimentAnalyzer
+
+CLS, SEP = 101, 102
+
+
+class WordTokenizer:
+    """Stands in for the fast tokenizer: one token per word, id = word"""
+
+    pad_token_id = 0
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [CLS] + ids + [SEP]
+
+    def __call__(self, texts, add_special_tokens, truncation, return_attention_mask,
+                 return_token_type_ids, max_length=None):
+        encoded = [[int(word) for word in text.split()] for text in texts]
+        if truncation:
+            encoded = [ids[:max_length] for ids in encoded]
+        return {"input_ids": encoded}
+
+
+def analyzer():
+    # Only the tokenizer is needed by the helpers under test, so skip loading a model
+    instance = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    instance.tokenizer = WordTokenizer()
+    return instance
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """A randomly initialised two-label DistilBERT small enough to load in milliseconds"""
+    path = tmp_path_factory.mktemp("tiny_model")
+    torch.manual_seed(0)
+    config = DistilBertConfig(vocab_size=128, dim=16, n_layers=1, n_heads=2, hidden_dim=32, max_position_embeddings=64)
+    DistilBertForSequenceClassification(config).eval().save_pretrained(path, safe_serialization=True)
+    return str(path)
+
+
+def loaded(model_path):
+    instance = analyzer()
+    instance._load_model(model_path)
+    return instance
+
+
+def words(n):
+    return " ".join(str(i) for i in range(n))
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MAX_SEQ_LENGTH", 12)
+    monkeypatch.setattr(sentiment_model, "HEAD_TOKENS", 4)
+    monkeypatch.setattr(sentiment_model, "BUCKET_BOUNDARIES", (4, 8, 16))
+    monkeypatch.setattr(sentiment_model, "MAX_BATCH_TOKENS", 8192)
+
+
+def test_head_truncation_keeps_the_first_tokens(limits, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "TRUNCATION_MODE", "head")
+    short, long = analyzer()._encode([words(3), words(20)])
+    assert short == [CLS, 0, 1, 2, SEP]
+    assert long == [CLS] + list(range(10)) + [SEP]
+
+
+def test_head_tail_truncation_keeps_both_ends(limits, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "TRUNCATION_MODE", "head_tail")
+    exact, long = analyzer()._encode([words(10), words(20)])
+    assert exact == [CLS] + list(range(10)) + [SEP]
+    # 10 tokens of budget: HEAD_TOKENS from the start, the other 6 from the end
+    assert long == [CLS, 0, 1, 2, 3, 14, 15, 16, 17, 18, 19, SEP]
+
+
+def test_head_tail_with_head_covering_the_budget(limits, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "TRUNCATION_MODE", "head_tail")
+    monkeypatch.setattr(sentiment_model, "HEAD_TOKENS", 50)
+    (long,) = analyzer()._encode([words(20)])
+    assert long == [CLS] + list(range(10)) + [SEP]
+
+
+def test_buckets_group_similar_lengths_and_cover_every_text(limits):
+    lengths = [12, 3, 7, 4, 5, 9, 2]
+    buckets = analyzer()._buckets(lengths)
+    # Boundaries above MAX_SEQ_LENGTH are dropped in favour of MAX_SEQ_LENGTH itself
+    assert [[lengths[i] for i in bucket] for bucket in buckets] == [[2, 3, 4], [5, 7], [9, 12]]
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+
+
+def test_buckets_cap_padded_tokens_per_forward(limits, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MAX_BATCH_TOKENS", 16)
+    lengths = [8] * 5
+    buckets = analyzer()._buckets(lengths)
+    assert [len(bucket) for bucket in buckets] == [2, 2, 1]
+    assert all(len(bucket) * 8 <= 16 for bucket in buckets)
+
+
+def test_buckets_of_nothing():
+    assert analyzer()._buckets([]) == []
+
+
+def test_unknown_backend_falls_back_to_pytorch(tiny_model, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MODEL_BACKEND", "tensorrt")
+    instance = loaded(tiny_model)
+    assert instance.backend == "pytorch" and instance.session is None
+
+
+def test_onnx_backend_without_a_graph_falls_back_to_pytorch(tiny_model, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MODEL_BACKEND", "onnx")
+    instance = loaded(tiny_model)
+    assert instance.backend == "pytorch" and instance.model is not None
+
+
+def test_int8_backend_quantizes_linear_layers_and_agrees_with_fp32(tiny_model, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MODEL_BACKEND", "pytorch")
+    fp32 = loaded(tiny_model)
+    monkeypatch.setattr(sentiment_model, "MODEL_BACKEND", "pytorch_int8")
+    int8 = loaded(tiny_model)
+    assert int8.backend == "pytorch_int8" and int8.device.type == "cpu"
+    assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in int8.model.modules())
+    input_ids, attention_mask = fp32._pad([[CLS, 5, 6, 7, SEP], [CLS, 9, SEP]])
+    expected = fp32._forward(input_ids, attention_mask).flatten().tolist()
+    assert int8._forward(input_ids, attention_mask).flatten().tolist() == pytest.approx(expected, abs=0.05)
+
+
+def test_mmap_state_dict_matches_safetensors(tiny_model):
+    from safetensors.torch import load_file
+
+    weights_path = f"{tiny_model}/model.safetensors"
+    mapped = sentiment_model.load_mmap_state_dict(weights_path)
+    expected = load_file(weights_path)
+    assert mapped.keys() == expected.keys()
+    for name, tensor in expected.items():
+        assert mapped[name].dtype == tensor.dtype and torch.equal(mapped[name], tensor), name
+
+
+@pytest.mark.skipif(torch.cuda.is_available(), reason="weights are only memory-mapped on CPU")
+def test_mmap_load_mode_serves_the_mapped_weights(tiny_model, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "MODEL_BACKEND", "pytorch")
+    monkeypatch.setattr(sentiment_model, "MODEL_LOAD_MODE", "default")
+    private = loaded(tiny_model)
+    monkeypatch.setattr(sentiment_model, "MODEL_LOAD_MODE", "mmap")
+    mapped = loaded(tiny_model)
+    assert mapped.weights_mmapped and not private.weights_mmapped
+    input_ids, attention_mask = private._pad([[CLS, 5, 6, 7, SEP], [CLS, 9, SEP]])
+    assert torch.equal(mapped._forward(input_ids, attention_mask), private._forward(input_ids, attention_mask))
@@ -0,0 +1,307 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# One JSON object per line, one line per evaluation run; lines are only ever
+# appended, so the newest run is always the last line. Anchored to the
+# repository root so every script and the backend share one file
+STORE_PATH = os.getenv("EVAL_STORE_PATH", os.path.join(REPO_ROOT, "evaluation", "runs.jsonl"))
+
+QUALITY_METRICS = ("accuracy", "f1", "precision", "recall")
+# Files that decide what a model predicts; tokenizer files are included
+# because a changed vocabulary changes predictions as much as new weights
+MODEL_FILES = (
+    "config.json", "model.safetensors", "pytorch_model.bin",
+    "tokenizer.json", "vocab.txt", "tokenizer_config.json", "special_tokens_map.json",
+)
+
+
+def model_hash(model_dir):
+    """sha256 of the model's config, weight and tokenizer file contents (first 16 hex digits)"""
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        digest.update(name.encode() + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def dataset_hash(texts, labels):
+    """sha256 of the evaluated texts and labels, in order (first 16 hex digits)"""
+    digest = hashlib.sha256()
+    for text, label in zip(texts, labels):
+        digest.update(f"{int(label)}\t{text}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def new_run(source, model, model_hash, dataset, dataset_hash, num_examples, metrics,
+            confusion_matrix=None, labels=None, latency=None, params=None, created_at=None):
+    """Build a run record; latency holds e.g. total_seconds, examples_per_second, ms_per_example"""
+    created_at = created_at or datetime.now(timezone.utc)
+    return {
+        "run_id": f"{created_at:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}",
+        "created_at": created_at.isoformat(),
+        "source": source,
+        "model": model,
+        "model_hash": model_hash,
+        "dataset": dataset,
+        "dataset_hash": dataset_hash,
+        "num_examples": int(num_examples),
+        "metrics": {name: float(value) for name, value in metrics.items()},
+        "latency": latency or {},
+        "confusion_matrix": [[int(count) for count in row] for row in confusion_matrix] if confusion_matrix is not None else None,
+        "labels": list(labels) if labels is not None else None,
+        "params": params or {},
+    }
+
+
+def append_run(run, path=STORE_PATH):
+    """Append one run as a single write, so concurrent writers never interleave lines"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = (json.dumps(run, sort_keys=True) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return run
+
+
+def iter_runs(path=STORE_PATH):
+    """Every run, oldest first; a torn last line from a crashed writer is skipped"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable line in {path}", file=sys.stderr)
+
+
+def latest_run(path=STORE_PATH):
+    """Newest run, read from the end of the file so the cost does not grow with history"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        block = 4096
+        data = b""
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            lines = data.split(b"\n")
+            # The first line may have been cut by the seek unless it starts the file
+            complete = lines if end == 0 else lines[1:]
+            for line in reversed(complete):
+                if not line.strip():
+                    continue
+                try:
+                    return json.loads(line)
+                except ValueError:
+                    continue
+            data = b"" if end == 0 else lines[0]
+            block *= 2
+    return None
+
+
+def query_runs(path=STORE_PATH, model_hash=None, dataset_hash=None, source=None, limit=None):
+    """Runs matching all given filters, newest first"""
+    runs = [
+        run for run in iter_runs(path)
+        if (model_hash is None or (run.get("model_hash") or "").startswith(model_hash))
+        and (dataset_hash is None or (run.get("dataset_hash") or "").startswith(dataset_hash))
+        and (source is None or run.get("source") == source)
+    ]
+    runs.reverse()
+    return runs[:limit] if limit else runs
+
+
+def get_run(run_id, path=STORE_PATH):
+    """A run by id (or unique id prefix), or "latest" """
+    if run_id == "latest":
+        return latest_run(path)
+    matches = [run for run in iter_runs(path) if run["run_id"].startswith(run_id)]
+    if len(matches) > 1:
+        raise KeyError(f"Run id prefix {run_id!r} is ambiguous")
+    return matches[0] if matches else None
+
+
+def compare_runs(baseline, candidate):
+    """Per-metric (baseline, candidate, delta) for quality metrics and throughput"""
+    comparison = {}
+    for name in QUALITY_METRICS:
+        if name in baseline["metrics"] and name in candidate["metrics"]:
+            before, after = baseline["metrics"][name], candidate["metrics"][name]
+            comparison[name] = (before, after, after - before)
+    for name in ("examples_per_second", "ms_per_example"):
+        if name in baseline.get("latency", {}) and name in candidate.get("latency", {}):
+            before, after = baseline["latency"][name], candidate["latency"][name]
+            comparison[name] = (before, after, after - before)
+    return comparison
+
+
+def regressions(comparison, max_drop):
+    """Quality metrics that dropped by more than max_drop"""
+    return [name for name in QUALITY_METRICS if name in comparison and comparison[name][2] < -max_drop]
+
+
+def parse_confusion_matrix(path):
+    """[[TN, FP], [FN, TP]] from a legacy confusion_matrix_<timestamp>.txt, or None"""
+    with open(path, "r") as f:
+        content = f.read()
+    counts = {}
+    for name in ("True Negatives", "False Positives", "False Negatives", "True Positives"):
+        match = re.search(rf"{name}: (\d+)", content)
+        if not match:
+            return None
+        counts[name] = int(match.group(1))
+    return [
+        [counts["True Negatives"], counts["False Positives"]],
+        [counts["False Negatives"], counts["True Positives"]],
+    ]
+
+
+def parse_text_results(path):
+    """Run record for a legacy results_<timestamp>.txt file written by older fine_tune.py,
+    with the confusion matrix from the matching confusion_matrix_<timestamp>.txt if there is one"""
+    with open(path, "r") as f:
+        content = f.read()
+    metrics = {}
+    for name in QUALITY_METRICS:
+        match = re.search(rf"{name}: ([\d\.]+)", content)
+        if match:
+            metrics[name] = float(match.group(1))
+    size = re.search(r"Test set size: (\d+)", content)
+    model = re.search(r"Model: (.+)", content)
+    timestamp = re.search(r"results_(\d{8}_\d{6})\.txt", os.path.basename(path))
+    created_at = None
+    matrix = None
+    if timestamp:
+        created_at = datetime.strptime(timestamp.group(1), "%Y%m%d_%H%M%S").replace(tzinfo=timezone.utc)
+        matrix_path = os.path.join(os.path.dirname(path), f"confusion_matrix_{timestamp.group(1)}.txt")
+        if os.path.exists(matrix_path):
+            matrix = parse_confusion_matrix(matrix_path)
+    return new_run(
+        source="legacy_text",
+        model=model.group(1).strip() if model else None,
+        model_hash=None,
+        dataset=None,
+        dataset_hash=None,
+        num_examples=int(size.group(1)) if size else 0,
+        metrics=metrics,
+        confusion_matrix=matrix,
+        labels=["negative", "positive"] if matrix is not None else None,
+        params={"imported_from": os.path.basename(path)},
+        created_at=created_at,
+    )
+
+
+def format_run(run):
+    lines = [
+        f"Run:       {run['run_id']} ({run.get('source')})",
+        f"Created:   {run.get('created_at')}",
+        f"Model:     {run.get('model')} [{run.get('model_hash')}]",
+        f"Dataset:   {run.get('dataset')} [{run.get('dataset_hash')}], {run.get('num_examples')} examples",
+    ]
+    for name in QUALITY_METRICS:
+        if name in run["metrics"]:
+            lines.append(f"{name.capitalize() + ':':<11}{run['metrics'][name]:.4f}")
+    latency = run.get("latency") or {}
+    if "examples_per_second" in latency:
+        lines.append(f"Throughput: {latency['examples_per_second']:.1f} examples/s")
+    if "ms_per_example" in latency:
+        lines.append(f"Latency:   {latency['ms_per_example']:.2f} ms/example")
+    if run.get("confusion_matrix"):
+        lines.append(f"Confusion: {run['confusion_matrix']} (rows: true {run.get('labels')})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and compare evaluation runs")
+    parser.add_argument("--store", default=STORE_PATH, help=f"runs file (default {STORE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list runs, newest first")
+    list_parser.add_argument("--model", help="model hash prefix")
+    list_parser.add_argument("--dataset", help="dataset hash prefix")
+    list_parser.add_argument("--source", help="e.g. fine_tune, evaluate")
+    list_parser.add_argument("--limit", type=int, default=20)
+
+    show_parser = commands.add_parser("show", help="print one run")
+    show_parser.add_argument("run_id", nargs="?", default="latest")
+
+    compare_parser = commands.add_parser("compare", help="metric deltas from a baseline run to a candidate run")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate", nargs="?", default="latest")
+    compare_parser.add_argument("--max-drop", type=float, default=None,
+                                help="exit non-zero if any quality metric drops by more than this")
+
+    import_parser = commands.add_parser("import-text", help="add legacy results_*.txt files to the store")
+    import_parser.add_argument("paths", nargs="*", default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        runs = query_runs(args.store, args.model, args.dataset, args.source, args.limit)
+        print(f"{'run_id':<24} {'source':<12} {'model_hash':<16} {'examples':>8} {'accuracy':>8} {'f1':>8} {'ex/s':>8}")
+        for run in runs:
+            metrics = run["metrics"]
+            throughput = (run.get("latency") or {}).get("examples_per_second")
+            print(
+                f"{run['run_id']:<24} {run.get('source') or '-':<12} {run.get('model_hash') or '-':<16} "
+                f"{run.get('num_examples', 0):>8} {metrics.get('accuracy', float('nan')):>8.4f} "
+                f"{metrics.get('f1', float('nan')):>8.4f} "
+                f"{throughput if throughput is not None else float('nan'):>8.1f}"
+            )
+    elif args.command == "show":
+        run = get_run(args.run_id, args.store)
+        if run is None:
+            sys.exit(f"No run {args.run_id!r} in {args.store}")
+        print(format_run(run))
+    elif args.command == "compare":
+        baseline, candidate = get_run(args.baseline, args.store), get_run(args.candidate, args.store)
+        if baseline is None or candidate is None:
+            sys.exit(f"Run not found in {args.store}")
+        if baseline.get("dataset_hash") != candidate.get("dataset_hash"):
+            print("Warning: the runs were evaluated on different datasets")
+        print(f"{baseline['run_id']} -> {candidate['run_id']}")
+        comparison = compare_runs(baseline, candidate)
+        for name, (before, after, delta) in comparison.items():
+            print(f"{name:<20} {before:>10.4f} {after:>10.4f} {delta:>+10.4f}")
+        if args.max_drop is not None:
+            dropped = regressions(comparison, args.max_drop)
+            if dropped:
+                sys.exit(f"Regression: {', '.join(dropped)} dropped by more than {args.max_drop}")
+    elif args.command == "import-text":
+        paths = args.paths or sorted(glob.glob(os.path.join(os.path.dirname(args.store) or ".", "results_*.txt")))
+        imported = {(run.get("params") or {}).get("imported_from") for run in iter_runs(args.store)}
+        for path in paths:
+            if os.path.basename(path) in imported:
+                print(f"Skipping {path}, already imported")
+                continue
+            run = append_run(parse_text_results(path), args.store)
+            imported.add(os.path.basename(path))
+            print(f"Imported {path} as {run['run_id']}")
+
+
+if __name__ == "__main__":
+    main()
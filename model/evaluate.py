@@ -12,13 +12,20 @@ from sklearn.metrics import (
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import argparse
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from torch.utils.data import DataLoader, Dataset
+
+import eval_store
 
 def load_model_and_tokenizer(model_path):
     print("Loading model and tokenizer...")
     tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
     return model, tokenizer
 
 def prepare_test_dataset():
@@ -38,22 +45,88 @@ def prepare_test_dataset():
     dataset = dataset.filter(lambda x: x['label'] != -1)
     return dataset
 
-def get_predictions(model, tokenizer, texts):
-    model.eval()
-    predictions = []
-    probabilities = []
-    
-    with torch.no_grad():
-        for text in texts:
-            inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-            outputs = model(**inputs)
-            logits = outputs.logits
+class ReviewBatches(Dataset):
+    """Length-sorted batches of reviews, tokenized by the DataLoader workers
+
+    Each item is one padded batch plus the positions of its reviews in the
+    input, so predictions can be put back in the original order.
+    """
+    def __init__(self, texts, tokenizer, batch_size, max_length):
+        self.texts = texts
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        # Character length is a cheap stand-in for token length; it is enough
+        # to keep each batch's padding small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        self.batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    
+    def __len__(self):
+        return len(self.batches)
+    
+    def __getitem__(self, index):
+        positions = self.batches[index]
+        inputs = self.tokenizer([self.texts[i] for i in positions], return_tensors="pt", truncation=True,
+                                max_length=self.max_length, padding=True, return_token_type_ids=False)
+        return torch.tensor(positions), inputs
+
+def get_predictions(model, tokenizer, texts, batch_size=64, max_length=512, num_workers=0):
+    """Predicted labels and positive-class probabilities, in the order of texts"""
+    texts = list(texts)
+    predictions = np.zeros(len(texts), dtype=np.int64)
+    probabilities = np.zeros(len(texts), dtype=np.float32)
+    if num_workers > 0:
+        # Tokenization runs in the worker processes; stop each of them
+        # from starting its own thread pool as well
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    loader = DataLoader(
+        ReviewBatches(texts, tokenizer, batch_size, max_length),
+        batch_size=None,  # the dataset already yields whole batches
+        num_workers=num_workers,
+        prefetch_factor=4 if num_workers > 0 else None,
+    )
+    
+    done = 0
+    started = time.perf_counter()
+    with torch.inference_mode():
+        for positions, inputs in loader:
+            logits = model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits
             probs = torch.softmax(logits, dim=1)
-            pred = torch.argmax(logits, dim=1)
-            predictions.append(pred.item())
-            probabilities.append(probs[0][1].item())  # Probability of positive class
+            predictions[positions.numpy()] = torch.argmax(logits, dim=1).numpy()
+            probabilities[positions.numpy()] = probs[:, 1].numpy()  # Probability of positive class
+            done += len(positions)
+            if done % (batch_size * 50) < batch_size or done == len(texts):
+                print(f"  {done}/{len(texts)} reviews, {done / (time.perf_counter() - started):.1f} reviews/s")
     
-    return np.array(predictions), np.array(probabilities)
+    return predictions, probabilities
+
+def predict_shard(model_path, texts, batch_size, max_length, num_workers, threads):
+    """Run one shard in its own process with its own copy of the model"""
+    if threads > 0:
+        torch.set_num_threads(threads)
+    model, tokenizer = load_model_and_tokenizer(model_path)
+    return get_predictions(model, tokenizer, texts, batch_size, max_length, num_workers)
+
+def get_predictions_sharded(model_path, texts, shards, batch_size=64, max_length=512, num_workers=0, threads=0):
+    """Split texts across processes, each with threads intra-op threads, and merge their predictions"""
+    texts = list(texts)
+    # Deal length-sorted reviews round-robin so every shard gets a similar mix of lengths
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    shard_positions = [order[shard::shards] for shard in range(shards)]
+    predictions = np.zeros(len(texts), dtype=np.int64)
+    probabilities = np.zeros(len(texts), dtype=np.float32)
+    # spawn, not fork: forking a process that already ran torch can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=shards, mp_context=context) as executor:
+        futures = [
+            executor.submit(predict_shard, model_path, [texts[i] for i in positions],
+                            batch_size, max_length, num_workers, threads)
+            for positions in shard_positions
+        ]
+        for positions, future in zip(shard_positions, futures):
+            shard_predictions, shard_probabilities = future.result()
+            predictions[positions] = shard_predictions
+            probabilities[positions] = shard_probabilities
+    return predictions, probabilities
 
 def plot_confusion_matrix(y_true, y_pred, save_path):
     cm = confusion_matrix(y_true, y_pred)
@@ -82,20 +155,48 @@ def plot_roc_curve(y_true, y_prob, save_path):
     plt.close()
 
 def main():
+    parser = argparse.ArgumentParser(description="Evaluate the sentiment model on the Yelp test split")
+    parser.add_argument("--model-dir", default="fine_tuned_model")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-length", type=int, default=512, help="tokens per review, as served by the backend")
+    parser.add_argument("--num-workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="DataLoader processes tokenizing batches (0 tokenizes in the main process)")
+    parser.add_argument("--shards", type=int, default=1, help="model processes to split the reviews across")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="torch threads per shard (default: CPU count divided by --shards)")
+    parser.add_argument("--limit", type=int, default=0, help="evaluate a fixed random sample of this many reviews")
+    args = parser.parse_args()
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.shards)
+    
     # Create results directory
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     results_dir = f"evaluation_results_{timestamp}"
     os.makedirs(results_dir, exist_ok=True)
     
-    # Load model and test data
-    model_path = "fine_tuned_model"
-    model, tokenizer = load_model_and_tokenizer(model_path)
+    # Load test data
+    model_path = args.model_dir
     test_dataset = prepare_test_dataset()
+    if args.limit:
+        test_dataset = test_dataset.shuffle(seed=42).select(range(min(args.limit, len(test_dataset))))
+    texts = test_dataset['text']
+    true_labels = test_dataset['label']
     
     # Get predictions
-    print("Generating predictions...")
-    predictions, probabilities = get_predictions(model, tokenizer, test_dataset['text'])
-    true_labels = test_dataset['label']
+    print(f"Generating predictions for {len(texts)} reviews "
+          f"({args.shards} shard(s) x {threads} thread(s), {args.num_workers} tokenizer worker(s))...")
+    # Sharded timings include every shard loading its own model
+    predict_started = time.perf_counter()
+    if args.shards > 1:
+        predictions, probabilities = get_predictions_sharded(
+            model_path, texts, args.shards, args.batch_size, args.max_length, args.num_workers, threads)
+    else:
+        torch.set_num_threads(threads)
+        model, tokenizer = load_model_and_tokenizer(model_path)
+        predict_started = time.perf_counter()
+        predictions, probabilities = get_predictions(
+            model, tokenizer, texts, args.batch_size, args.max_length, args.num_workers)
+    predict_seconds = time.perf_counter() - predict_started
+    examples_per_second = len(texts) / predict_seconds
     
     # Calculate metrics
     accuracy = accuracy_score(true_labels, predictions)
@@ -120,17 +221,46 @@ def main():
         f.write(f"Accuracy: {accuracy:.4f}\n")
         f.write(f"Precision: {precision:.4f}\n")
         f.write(f"Recall: {recall:.4f}\n")
-        f.write(f"F1 Score: {f1:.4f}\n\n")
+        f.write(f"F1 Score: {f1:.4f}\n")
+        f.write(f"Throughput: {examples_per_second:.1f} reviews/s ({len(texts)} reviews in {predict_seconds:.1f}s)\n\n")
         f.write("Classification Report:\n")
         f.write("--------------------\n")
         f.write(report)
     
+    # Record the run in the evaluation store
+    run = eval_store.append_run(eval_store.new_run(
+        source="evaluate",
+        model=model_path,
+        model_hash=eval_store.model_hash(model_path),
+        dataset="yelp_review_full test (binary)",
+        dataset_hash=eval_store.dataset_hash(texts, true_labels),
+        num_examples=len(true_labels),
+        metrics={"accuracy": accuracy, "f1": f1, "precision": precision, "recall": recall},
+        confusion_matrix=confusion_matrix(true_labels, predictions),
+        labels=["negative", "positive"],
+        latency={
+            "total_seconds": predict_seconds,
+            "examples_per_second": examples_per_second,
+            "ms_per_example": 1000 * predict_seconds / len(true_labels),
+        },
+        params={
+            "results_dir": results_dir,
+            "batch_size": args.batch_size,
+            "max_length": args.max_length,
+            "num_workers": args.num_workers,
+            "shards": args.shards,
+            "threads": threads,
+        },
+    ))
+    
     print(f"\nEvaluation completed! Results saved to {results_dir}")
+    print(f"Evaluation run {run['run_id']} saved to {eval_store.STORE_PATH}")
     print("\nKey Metrics:")
     print(f"Accuracy: {accuracy:.4f}")
     print(f"Precision: {precision:.4f}")
     print(f"Recall: {recall:.4f}")
     print(f"F1 Score: {f1:.4f}")
+    print(f"Throughput: {examples_per_second:.1f} reviews/s")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,151 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from datasets import load_dataset
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+# Written next to the PyTorch weights; the backend picks them up with
+# MODEL_BACKEND=onnx and ONNX_MODEL_FILE=model.onnx / model.int8.onnx
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+def export_onnx(model, tokenizer, output_path, opset=14):
+    """Export the classifier with dynamic batch and sequence axes"""
+    print(f"Exporting ONNX graph to {output_path}...")
+    sample = tokenizer(["An example review", "Another, slightly longer example review"],
+                       return_tensors="pt", padding=True)
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"]),
+        output_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=opset,
+        do_constant_folding=True,
+    )
+
+
+def quantize_onnx(input_path, output_path):
+    """Dynamic INT8 quantization of the exported graph's weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"Quantizing ONNX graph to {output_path}...")
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+
+
+def load_held_out_texts(num_samples):
+    """A fixed random sample of the Yelp test split used by evaluate.py"""
+    print(f"Loading {num_samples} held-out reviews...")
+    dataset = load_dataset("yelp_review_full", split="test").shuffle(seed=42)
+    return dataset.select(range(min(num_samples, len(dataset))))["text"]
+
+
+def predict_torch(model, batches):
+    probabilities = []
+    with torch.inference_mode():
+        for inputs in batches:
+            logits = model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits
+            probabilities.append(torch.softmax(logits, dim=1).numpy())
+    return np.concatenate(probabilities)
+
+
+def predict_onnx(session, batches):
+    probabilities = []
+    for inputs in batches:
+        logits = session.run(["logits"], {
+            "input_ids": inputs["input_ids"].numpy(),
+            "attention_mask": inputs["attention_mask"].numpy(),
+        })[0]
+        probabilities.append(torch.softmax(torch.from_numpy(logits), dim=1).numpy())
+    return np.concatenate(probabilities)
+
+
+def timed(predict, *args):
+    start = time.perf_counter()
+    result = predict(*args)
+    return result, time.perf_counter() - start
+
+
+def verify(model_dir, tokenizer, texts, onnx_paths, batch_size, min_agreement):
+    """Compare every candidate backend's predictions against FP32 PyTorch"""
+    # Sort by length so batches carry little padding, as the backend does
+    texts = sorted(texts, key=len)
+    batches = [
+        tokenizer(texts[i:i + batch_size], return_tensors="pt", truncation=True,
+                  max_length=512, padding=True, return_token_type_ids=False)
+        for i in range(0, len(texts), batch_size)
+    ]
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    reference, reference_time = timed(predict_torch, model, batches)
+    candidates = {"pytorch_int8": (predict_torch, torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8))}
+
+    import onnxruntime
+    for name, path in onnx_paths.items():
+        candidates[name] = (predict_onnx, onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"]))
+
+    print("\nBackend agreement with PyTorch FP32")
+    print("===================================")
+    print(f"{'backend':<14} {'agreement':>10} {'max |dp|':>10} {'ms/review':>10} {'speedup':>8}")
+    print(f"{'pytorch':<14} {1.0:>10.4f} {0.0:>10.4f} {reference_time / len(texts) * 1000:>10.2f} {1.0:>8.2f}")
+
+    passed = True
+    for name, (predict, runner) in candidates.items():
+        probabilities, elapsed = timed(predict, runner, batches)
+        agreement = float(np.mean(probabilities.argmax(axis=1) == reference.argmax(axis=1)))
+        max_diff = float(np.max(np.abs(probabilities - reference)))
+        print(f"{name:<14} {agreement:>10.4f} {max_diff:>10.4f} "
+              f"{elapsed / len(texts) * 1000:>10.2f} {reference_time / elapsed:>8.2f}")
+        if agreement < min_agreement:
+            print(f"  -> {name} agrees on fewer than {min_agreement:.2%} of reviews")
+            passed = False
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, quantize and verify the sentiment model for CPU serving")
+    parser.add_argument("--model-dir", default="fine_tuned_model")
+    parser.add_argument("--output-dir", default=None, help="defaults to --model-dir")
+    parser.add_argument("--no-quantize", action="store_true", help="skip the INT8 ONNX graph")
+    parser.add_argument("--samples", type=int, default=1000, help="held-out reviews to verify on (0 skips)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.model_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Loading model and tokenizer...")
+    tokenizer = AutoTokenizer.from_pretrained(args.model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model_dir).eval()
+
+    onnx_paths = {"onnx": os.path.join(output_dir, ONNX_FILE)}
+    export_onnx(model, tokenizer, onnx_paths["onnx"])
+    if not args.no_quantize:
+        onnx_paths["onnx_int8"] = os.path.join(output_dir, ONNX_INT8_FILE)
+        quantize_onnx(onnx_paths["onnx"], onnx_paths["onnx_int8"])
+
+    for path in onnx_paths.values():
+        print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    if args.samples > 0:
+        texts = load_held_out_texts(args.samples)
+        if not verify(args.model_dir, tokenizer, texts, onnx_paths, args.batch_size, args.min_agreement):
+            print("\nVerification failed, do not deploy these graphs.")
+            sys.exit(1)
+        print("\nVerification passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ import seaborn as sns
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments
 from datasets import Dataset
 from datetime import datetime
+import time
+
+import eval_store
 
 # Configuration
 MODEL_NAME = "distilbert-base-uncased"
@@ -131,7 +134,9 @@ tokenizer.save_pretrained(OUTPUT_DIR)
 
 # Evaluate the model
 print("Evaluating model...")
+predict_started = time.perf_counter()
 predictions = trainer.predict(test_dataset)
+predict_seconds = time.perf_counter() - predict_started
 preds = np.argmax(predictions.predictions, axis=1)
 labels = predictions.label_ids
 
@@ -144,26 +149,26 @@ cm = confusion_matrix(labels, preds)
 
 # Save results
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-results_file = os.path.join(EVAL_DIR, f"results_{timestamp}.txt")
 cm_file = os.path.join(EVAL_DIR, f"confusion_matrix_{timestamp}.png")
 
-# Save metrics to file
-with open(results_file, "w") as f:
-    f.write("Model Evaluation Results\n")
-    f.write("=======================\n")
-    f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-    f.write(f"Model: fine-tuned {MODEL_NAME} for sentiment analysis\n\n")
-    f.write("Metrics:\n")
-    f.write(f"- accuracy: {accuracy:.4f}\n")
-    f.write(f"- f1: {f1:.4f}\n")
-    f.write(f"- precision: {precision:.4f}\n")
-    f.write(f"- recall: {recall:.4f}\n\n")
-    f.write(f"Test set size: {len(test_df)} samples\n")
-    f.write(f"Training time: {EPOCHS} epochs\n\n")
-    f.write("Notes:\n")
-    f.write("- Model fine-tuned on synthetic sentiment analysis data\n")
-    f.write("- Performance metrics are based on the test set\n")
-    f.write("- For production use, consider fine-tuning on a larger, domain-specific dataset\n")
+# Record the run in the evaluation store
+run = eval_store.append_run(eval_store.new_run(
+    source="fine_tune",
+    model=f"fine-tuned {MODEL_NAME}",
+    model_hash=eval_store.model_hash(OUTPUT_DIR),
+    dataset="synthetic (fine_tune.py test split)",
+    dataset_hash=eval_store.dataset_hash(test_df["text"], test_df["label"]),
+    num_examples=len(test_df),
+    metrics={"accuracy": accuracy, "f1": f1, "precision": precision, "recall": recall},
+    confusion_matrix=cm,
+    labels=["negative", "positive"],
+    latency={
+        "total_seconds": predict_seconds,
+        "examples_per_second": len(test_df) / predict_seconds,
+        "ms_per_example": 1000 * predict_seconds / len(test_df),
+    },
+    params={"epochs": EPOCHS, "batch_size": BATCH_SIZE, "learning_rate": LEARNING_RATE, "confusion_matrix_image": cm_file},
+))
 
 # Plot confusion matrix
 plt.figure(figsize=(8, 6))
@@ -176,7 +181,7 @@ plt.title('Confusion Matrix')
 plt.savefig(cm_file)
 plt.close()
 
-print(f"Evaluation results saved to {results_file}")
+print(f"Evaluation run {run['run_id']} saved to {eval_store.STORE_PATH}")
 print(f"Confusion matrix saved to {cm_file}")
 print("\nModel Evaluation Metrics:")
 print(f"Accuracy: {accuracy:.4f}")
@@ -0,0 +1,126 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+import eval_store
+
+
+def make_run(model_hash, dataset_hash, accuracy, f1, source="evaluate", examples_per_second=None):
+    latency = {"examples_per_second": examples_per_second} if examples_per_second is not None else None
+    return eval_store.new_run(
+        source=source, model="model", model_hash=model_hash, dataset="test.csv", dataset_hash=dataset_hash,
+        num_examples=100, metrics={"accuracy": accuracy, "f1": f1}, latency=latency,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "runs.jsonl")
+    # A legacy import has no hashes
+    eval_store.append_run(make_run(None, None, 0.80, 0.79, source="legacy_text"), path)
+    eval_store.append_run(make_run("aaaa1111", "dddd1111", 0.90, 0.89), path)
+    eval_store.append_run(make_run("bbbb2222", "dddd1111", 0.91, 0.90, source="fine_tune"), path)
+    return path
+
+
+def test_query_filters_skip_runs_without_hashes(store):
+    assert [run["model_hash"] for run in eval_store.query_runs(store, model_hash="aaaa")] == ["aaaa1111"]
+    assert len(eval_store.query_runs(store, dataset_hash="dddd")) == 2
+    assert eval_store.query_runs(store, model_hash="ffff") == []
+
+
+def test_query_is_newest_first_and_limited(store):
+    runs = eval_store.query_runs(store, limit=2)
+    assert [run["model_hash"] for run in runs] == ["bbbb2222", "aaaa1111"]
+    assert [run["source"] for run in eval_store.query_runs(store, source="legacy_text")] == ["legacy_text"]
+
+
+def test_latest_run_skips_a_torn_last_line(store):
+    with open(store, "a") as f:
+        f.write('{"run_id": "torn')
+    assert eval_store.latest_run(store)["model_hash"] == "bbbb2222"
+
+
+def test_get_run_by_prefix_and_latest(store):
+    run_id = eval_store.query_runs(store, model_hash="aaaa")[0]["run_id"]
+    assert eval_store.get_run(run_id[:20], store)["run_id"] == run_id
+    assert eval_store.get_run("latest", store)["model_hash"] == "bbbb2222"
+    assert eval_store.get_run("nope", store) is None
+
+
+def test_compare_and_regressions():
+    baseline = make_run("a", "d", 0.90, 0.89, examples_per_second=100.0)
+    candidate = make_run("b", "d", 0.85, 0.895, examples_per_second=150.0)
+    comparison = eval_store.compare_runs(baseline, candidate)
+    assert comparison["accuracy"] == pytest.approx((0.90, 0.85, -0.05))
+    assert comparison["examples_per_second"] == (100.0, 150.0, 50.0)
+    assert eval_store.regressions(comparison, max_drop=0.01) == ["accuracy"]
+    assert eval_store.regressions(comparison, max_drop=0.1) == []
+
+
+def test_append_writes_one_line_per_run(store):
+    with open(store) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    assert all(json.loads(line)["run_id"] for line in lines)
+
+
+def test_store_is_anchored_to_the_repository(monkeypatch):
+    monkeypatch.delenv("EVAL_STORE_PATH", raising=False)
+    reloaded = importlib.reload(eval_store)
+    try:
+        assert reloaded.STORE_PATH == os.path.join(reloaded.REPO_ROOT, "evaluation", "runs.jsonl")
+        assert os.path.isabs(reloaded.STORE_PATH)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(eval_store)
+
+
+LEGACY_RESULTS = """Model Evaluation Results
+Model: fine-tuned BERT
+
+Metrics:
+- accuracy: 0.9245
+- f1: 0.9187
+
+Test set size: 1000 samples
+"""
+LEGACY_MATRIX = """The confusion matrix would show:
+- True Positives: 450
+- False Positives: 35
+- True Negatives: 465
+- False Negatives: 50
+"""
+
+
+@pytest.fixture
+def legacy_dir(tmp_path):
+    (tmp_path / "results_20250317_003500.txt").write_text(LEGACY_RESULTS)
+    (tmp_path / "confusion_matrix_20250317_003500.txt").write_text(LEGACY_MATRIX)
+    (tmp_path / "results_20250317_014237.txt").write_text(LEGACY_RESULTS)
+    return tmp_path
+
+
+def test_legacy_import_reads_the_matching_confusion_matrix(legacy_dir):
+    run = eval_store.parse_text_results(str(legacy_dir / "results_20250317_003500.txt"))
+    assert run["confusion_matrix"] == [[465, 35], [50, 450]]
+    assert run["labels"] == ["negative", "positive"]
+    assert run["created_at"] == "2025-03-17T00:35:00+00:00"
+    assert (run["num_examples"], run["metrics"]["f1"]) == (1000, 0.9187)
+    without_matrix = eval_store.parse_text_results(str(legacy_dir / "results_20250317_014237.txt"))
+    assert without_matrix["confusion_matrix"] is None and without_matrix["labels"] is None
+
+
+def test_import_text_skips_files_already_imported(legacy_dir, monkeypatch, capsys):
+    store = str(legacy_dir / "runs.jsonl")
+    monkeypatch.setattr(sys, "argv", ["eval_store.py", "--store", store, "import-text"])
+    eval_store.main()
+    eval_store.main()
+    runs = list(eval_store.iter_runs(store))
+    assert [run["params"]["imported_from"] for run in runs] == [
+        "results_20250317_003500.txt", "results_20250317_014237.txt",
+    ]
+    assert capsys.readouterr().out.count("already imported") == 2
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+import evaluate
+
+
+class WordTokenizer:
+    """One token per word, padded to the longest text of the batch"""
+
+    def __call__(self, texts, return_tensors, truncation, max_length, padding, return_token_type_ids):
+        lengths = [min(len(text.split()), max_length) for text in texts]
+        width = max(lengths)
+        mask = torch.tensor([[1] * n + [0] * (width - n) for n in lengths])
+        return {"input_ids": mask * 7, "attention_mask": mask}
+
+
+class LengthModel:
+    """Calls a review positive when it has more than three words"""
+
+    def __call__(self, input_ids, attention_mask):
+        words = attention_mask.sum(dim=1).float()
+        return SimpleNamespace(logits=torch.stack([3.5 - words, words - 3.5], dim=1))
+
+
+TEXTS = ["one two three four five", "bad", "great food and great staff here", "meh ok", "a b c d", "no"]
+
+
+def test_batches_are_length_sorted_and_cover_every_review():
+    batches = evaluate.ReviewBatches(TEXTS, WordTokenizer(), batch_size=4, max_length=512)
+    assert len(batches) == 2
+    order = [i for batch in batches.batches for i in batch]
+    assert sorted(order) == list(range(len(TEXTS)))
+    assert [len(TEXTS[i]) for i in order] == sorted(len(text) for text in TEXTS)
+    positions, inputs = batches[1]
+    assert positions.tolist() == batches.batches[1]
+    assert inputs["input_ids"].shape == (2, 6)
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_predictions_come_back_in_input_order(num_workers):
+    predictions, probabilities = evaluate.get_predictions(
+        LengthModel(), WordTokenizer(), TEXTS, batch_size=4, max_length=512, num_workers=num_workers)
+    assert predictions.tolist() == [1, 0, 1, 0, 1, 0]
+    assert np.all((probabilities > 0.5) == (predictions == 1))
+
+
+def test_max_length_truncates_before_the_model_sees_the_review():
+    predictions, _ = evaluate.get_predictions(LengthModel(), WordTokenizer(), TEXTS, batch_size=2, max_length=3)
+    assert predictions.tolist() == [0] * len(TEXTS)
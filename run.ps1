@@ -6,6 +6,8 @@ Write-Host "=============================================" -ForegroundColor Gree
 # Start backend server
 $backendJob = Start-Job -ScriptBlock {
     Set-Location "$env:USERPROFILE\OneDrive\Desktop\Sentiment Analysis\backend"
+    Write-Host "Applying database migrations..." -ForegroundColor Cyan
+    alembic upgrade head
     Write-Host "Starting backend server..." -ForegroundColor Cyan
     uvicorn main:app --reload
 }
@@ -37,6 +37,8 @@ $startedFrontend = $false
 if (-not $backendRunning) {
     $backendJob = Start-Job -ScriptBlock {
         Set-Location "$env:USERPROFILE\OneDrive\Desktop\Sentiment Analysis\backend"
+        # The API tests check that non-admins are refused by the profiling endpoint
+        $env:PROFILING_ENABLED = "true"
         uvicorn main:app --reload
     }
     $startedBackend = $true